@@ -1,17 +1,1815 @@
 from beets.plugins import BeetsPlugin
 from beets.ui import Subcommand
-from beets import ui
+from beets import config, ui
+from beets.dbcore.query import AndQuery, InQuery, Query
+from beets.dbcore.queryparse import sort_from_strings
+from beets.library import Item, parse_query_parts
+from beets.util import normpath, syspath
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager, nullcontext
+import bisect
+import csv
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import shlex
 import subprocess
 import platform
+import re
+import sys
+import threading
+import time
+
+
+# Session phases in the order they are reported by --profile
+PROFILE_PHASES = ('query', 'load', 'think', 'store', 'write', 'play')
+
+
+class _Profiler:
+    """Collect wall-clock durations of the phases of a session.
+
+    A disabled profiler records nothing, so the timing hooks can stay in
+    the hot path. Samples may be recorded from any thread.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.samples = {}  # phase -> durations in seconds
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def _record(self, name, duration):
+        with self._lock:
+            self.samples.setdefault(name, []).append(duration)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the body of a `with` block as one sample of a phase."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(name, time.perf_counter() - start)
+
+    def iterate(self, name, iterable):
+        """Yield from an iterable, timing how long each element takes to produce."""
+        if not self.enabled:
+            yield from iterable
+            return
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                value = next(iterator)
+            except StopIteration:
+                return
+            self._record(name, time.perf_counter() - start)
+            yield value
+
+    def summary(self):
+        """Return the wall time and per-phase statistics, in seconds."""
+        phases = {}
+        for name in sorted(self.samples, key=_phase_order):
+            durations = sorted(self.samples[name])
+            phases[name] = {
+                'count': len(durations),
+                'total': sum(durations),
+                'p50': _percentile(durations, 50),
+                'p95': _percentile(durations, 95),
+                'max': durations[-1],
+            }
+        return {'wall': time.perf_counter() - self._started, 'phases': phases}
+
+    def report(self):
+        """Print the phase statistics as a table."""
+        summary = self.summary()
+        ui.print_(f"Profile ({summary['wall']:.2f}s wall time, durations in ms):")
+        ui.print_(f"  {'phase':<6} {'count':>7} {'total':>10} {'p50':>9} {'p95':>9} {'max':>9}")
+        for name, stats in summary['phases'].items():
+            ui.print_(
+                f"  {name:<6} {stats['count']:>7} {stats['total'] * 1000:>10.1f} "
+                f"{stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} "
+                f"{stats['max'] * 1000:>9.1f}"
+            )
+
+    def dump(self, path):
+        """Write the phase statistics to a JSON file."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def _report_profile(profiler, json_path):
+    """Print an enabled profiler's report, and dump it if a path is given."""
+    if not profiler.enabled:
+        return
+    profiler.report()
+    if json_path:
+        profiler.dump(json_path)
+
+
+def _phase_order(name):
+    if name in PROFILE_PHASES:
+        return (PROFILE_PHASES.index(name), name)
+    return (len(PROFILE_PHASES), name)
+
+
+def _percentile(ordered, percent):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = math.ceil(percent / 100 * len(ordered))
+    return ordered[max(rank, 1) - 1]
+
+
+class _TagWriter:
+    """Write item tags to disk on a bounded pool of background threads.
+
+    Writes to the same path run in submission order. Failures are
+    collected instead of raised so the prompt loop is never interrupted.
+    """
+
+    def __init__(self, threads, profiler=None):
+        self._profiler = profiler or _Profiler()
+        self._executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='fillmissing-write'
+        )
+        # Bound the queue so a slow disk applies back-pressure
+        self._slots = threading.BoundedSemaphore(threads * 2)
+        self._lock = threading.Lock()
+        self._last_write = {}  # path -> future of the latest queued write
+        self.failures = []
+
+    def submit(self, item):
+        """Queue a tag write for an item."""
+        self._slots.acquire()
+        with self._lock:
+            previous = self._last_write.get(item.path)
+            future = self._executor.submit(self._write, item, previous)
+            self._last_write[item.path] = future
+        future.add_done_callback(lambda f, path=item.path: self._done(path, f))
+
+    def _write(self, item, previous):
+        if previous is not None:
+            # Earlier writes to the same file must land first
+            wait([previous])
+        try:
+            with self._profiler.phase('write'):
+                item.write()
+        except Exception as e:
+            with self._lock:
+                self.failures.append((item, e))
+
+    def _done(self, path, future):
+        with self._lock:
+            if self._last_write.get(path) is future:
+                del self._last_write[path]
+        self._slots.release()
+
+    def drain(self):
+        """Wait for all queued writes and return the failures."""
+        self._executor.shutdown(wait=True)
+        return self.failures
+
+
+class _SystemPlayer:
+    """Open tracks in the desktop's default audio application.
+
+    Every track spawns a new opener process; stopping it may not stop
+    the application it launched.
+    """
+
+    def __init__(self):
+        self._process = None
+
+    def play(self, file_path):
+        # Stop previous playback if any
+        self.stop()
+
+        # Determine the command based on OS
+        system = platform.system()
+        if system == 'Darwin': # Mac OS X
+            self._process = subprocess.Popen(
+                ['open', file_path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        elif system == 'Windows':
+            self._process = subprocess.Popen(
+                f'start "" "{file_path}"',
+                shell=True,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        else:  # Linux and others
+            self._process = subprocess.Popen(
+                ['xdg-open', file_path],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+
+    def stop(self):
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+            self._process.wait(timeout=1)
+
+    def close(self):
+        if self._process and self._process.poll() is None:
+            self._process.terminate()
+
+
+class _PersistentPlayer:
+    """Drive one long-lived player process through its standard input.
+
+    The player is started on first use and reused for every track, so
+    starting and stopping playback is a single line written to a pipe.
+    It is restarted if it exits, and shut down with the session.
+    """
+
+    def __init__(self, command, play_command, stop_command):
+        self.command = shlex.split(command)
+        self.play_command = play_command
+        self.stop_command = stop_command
+        self._process = None
+
+    def _send(self, line):
+        if self._process is None or self._process.poll() is not None:
+            self._process = subprocess.Popen(
+                self.command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True,
+            )
+        self._process.stdin.write(line + '\n')
+        self._process.stdin.flush()
+
+    def play(self, file_path):
+        # The path goes inside a double-quoted string of the player's
+        # command language, so quotes and backslashes must be escaped
+        quoted = file_path.replace('\\', '\\\\').replace('"', '\\"')
+        line = self.play_command.format(path=quoted)
+        try:
+            self._send(line)
+        except BrokenPipeError:
+            # The player died since the last command: start a fresh one
+            self._process = None
+            self._send(line)
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            try:
+                self._send(self.stop_command)
+            except BrokenPipeError:
+                pass
+
+    def close(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            try:
+                self._process.stdin.close()
+            except OSError:
+                pass
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        self._process = None
+
+
+def _make_player():
+    """Return the configured player backend."""
+    player_config = config['fillmissing']['player']
+    command = player_config['command'].as_str()
+    if command:
+        return _PersistentPlayer(
+            command,
+            player_config['play'].as_str(),
+            player_config['stop'].as_str(),
+        )
+    return _SystemPlayer()
+
+
+# Size of the reads used to pull a file into the page cache
+PREFETCH_CHUNK_SIZE = 1024 * 1024
+
+
+class _Prefetcher:
+    """Warm the page cache for upcoming tracks on a background thread.
+
+    Only the latest request is worked on, so moving quickly through
+    tracks never builds up a backlog of reads, and at most `budget`
+    bytes are read ahead for each request.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self._condition = threading.Condition()
+        self._wanted = None
+        self._closed = False
+        self._warmed = {}  # path -> bytes from the start already read
+        self._thread = None
+
+    def warm(self, paths):
+        """Read ahead the given paths, in order, replacing any earlier request."""
+        with self._condition:
+            self._wanted = list(paths)
+            self._condition.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name='fillmissing-prefetch', daemon=True
+            )
+            self._thread.start()
+
+    def _interrupted(self):
+        return self._closed or self._wanted is not None
+
+    def _take(self):
+        with self._condition:
+            while self._wanted is None and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            paths, self._wanted = self._wanted, None
+            return paths
+
+    def _run(self):
+        while True:
+            paths = self._take()
+            if paths is None:
+                return
+            remaining = self.budget
+            warmed = {}
+            for path in paths:
+                if remaining <= 0 or self._interrupted():
+                    break
+                # Bytes warmed for an earlier request need no second read
+                end = self._read_ahead(path, self._warmed.get(path, 0), remaining)
+                warmed[path] = end
+                remaining -= end
+            self._warmed = warmed
+
+    def _read_ahead(self, path, start, limit):
+        """Read a file from `start` up to `limit` bytes; return where it stopped."""
+        try:
+            fd = os.open(syspath(path), os.O_RDONLY)
+        except OSError:
+            return start
+        position = start
+        try:
+            end = min(os.fstat(fd).st_size, limit)
+            if position >= end:
+                return end
+            # Hint the kernel first, then read, since many network
+            # filesystems ignore the hint
+            if hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, position, end - position, os.POSIX_FADV_WILLNEED)
+            os.lseek(fd, position, os.SEEK_SET)
+            while position < end and not self._interrupted():
+                data = os.read(fd, min(PREFETCH_CHUNK_SIZE, end - position))
+                if not data:
+                    break
+                position += len(data)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+        return position
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+def _lookahead(groups, depth):
+    """Yield each group together with a list of up to `depth` groups after it."""
+    groups = iter(groups)
+    buffered = deque(itertools.islice(groups, depth))
+    while True:
+        buffered.extend(itertools.islice(groups, 1))
+        if not buffered:
+            return
+        group = buffered.popleft()
+        yield group, list(buffered)
+
+
+class _Checkpoint:
+    """Append-only journal of finished steps, used to resume a session.
+
+    Each line holds an item id and the number of its fields that are
+    done. A track counts as finished once its position reaches the
+    number of fields. Lines are only appended after the track's edits
+    have been stored, so the journal never runs ahead of the database.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def _load(self):
+        """Read the journal into (finished ids, {id: field position})."""
+        finished = set()
+        partial = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        item_id, position = map(int, line.split())
+                    except ValueError:
+                        continue  # Torn last line after a crash
+                    partial[item_id] = position
+        except FileNotFoundError:
+            pass
+        for item_id, position in list(partial.items()):
+            if position == 0 or position >= self.field_count:
+                del partial[item_id]
+                if position:
+                    finished.add(item_id)
+        return finished, partial
+
+    def open(self, field_count, resume):
+        """Start journaling, keeping previous entries when resuming."""
+        self.field_count = field_count
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if resume:
+            state = self._load()
+        else:
+            state = (set(), {})
+        self._file = open(self.path, 'a' if resume else 'w')
+        return state
+
+    def record(self, item_id, position):
+        """Note that the first `position` fields of an item are done."""
+        self._file.write(f"{item_id} {position}\n")
+        self._file.flush()
+
+    def close(self, finished=False):
+        """Stop journaling; a finished session has nothing to resume."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if finished and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _checkpoint_path(lib, args, field_list):
+    """Return the journal path for a library, query and field list."""
+    key = repr((lib.path, list(args), field_list)).encode('utf-8')
+    digest = hashlib.sha1(key).hexdigest()[:16]
+    return os.path.join(config.config_dir(), 'fillmissing', f'{digest}.checkpoint')
+
+
+class _UndoJournal:
+    """Append-only log of every stored change, for --rollback.
+
+    Each line is a JSON object with the item id, field, old and new
+    value and a timestamp. A journal is one session, named after the
+    time it started; journals without changes are removed on close.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        base = time.strftime('%Y%m%d-%H%M%S')
+        for attempt in itertools.count():
+            self.session = base if attempt == 0 else f'{base}-{attempt}'
+            self.path = os.path.join(directory, f'{self.session}.jsonl')
+            try:
+                self._file = open(self.path, 'x', encoding='utf-8')
+                break
+            except FileExistsError:
+                continue
+        self.changes = 0
+
+    def record(self, item_id, field, old, new):
+        self._file.write(json.dumps({
+            'id': item_id,
+            'field': field,
+            'old': old,
+            'new': new,
+            'time': time.time(),
+        }, default=str) + '\n')
+        self.changes += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        if not self.changes:
+            os.remove(self.path)
+
+    @staticmethod
+    def read(path):
+        """Return {(item id, field): value before the session} for a journal."""
+        original = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    change = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line after a crash
+                # The first change of a field holds its value before the session
+                original.setdefault((change['id'], change['field']), change['old'])
+        return original
+
+
+def _undo_dir():
+    return os.path.join(config.config_dir(), 'fillmissing', 'undo')
+
+
+def _rollback_session(lib, session):
+    """Restore every field changed in a session to its earlier value.
+
+    All items are stored in one transaction; afterwards only the files
+    with a changed tag-backed field are rewritten, on the background
+    writer. Files of items still marked dirty never got the session's
+    tags, so they are left alone and the mark is cleared instead. The
+    journal is kept, renamed, so a session is only rolled back once.
+    """
+    path = os.path.join(_undo_dir(), f'{session}.jsonl')
+    try:
+        original = _UndoJournal.read(path)
+    except FileNotFoundError:
+        ui.print_(f"Error: No undo journal for session '{session}' in {_undo_dir()}")
+        return
+
+    by_item = {}
+    for (item_id, field), value in original.items():
+        by_item.setdefault(item_id, {})[field] = value
+
+    to_write = []
+    with lib.transaction():
+        for item in _iter_items(lib, list(by_item)):
+            fields = by_item[item.id]
+            for field, value in fields.items():
+                if value is None:
+                    # The field did not exist before the session
+                    if field in item:
+                        del item[field]
+                else:
+                    item[field] = value
+            if _file_backed_fields(fields):
+                if DIRTY_FIELD in item:
+                    del item[DIRTY_FIELD]
+                else:
+                    to_write.append(item)
+            item.store()
+
+    # Files are only touched once the database is back in its old state
+    writer = _TagWriter(config['fillmissing']['write_threads'].get(int))
+    for item in to_write:
+        writer.submit(item)
+    _report_write_failures(writer.drain())
+    os.replace(path, path + '.rolledback')
+
+    ui.print_(f"Rolled back {len(original)} change(s) on {len(by_item)} track(s).")
+
+
+def _report_unchanged(save):
+    if save.unchanged:
+        ui.print_(
+            f"Skipped {save.unchanged} unchanged value(s): avoided "
+            f"{save.avoided_stores} database store(s) and {save.avoided_writes} tag write(s)."
+        )
+
+
+def _report_undo_hint(journal):
+    if journal.changes:
+        ui.print_(f"Undo with: beet fillmissing --rollback {journal.session}")
+
+
+def _finish_saving(save):
+    """Wait for a session's tag writes and close its undo journal."""
+    _report_write_failures(save.writer.drain())
+    save.journal.close()
+    _report_unchanged(save)
+    _report_undo_hint(save.journal)
+
+
+# Flexible attribute marking items whose tags still need writing
+DIRTY_FIELD = 'fillmissing_dirty'
+
+
+def _dirty_item_rows(lib):
+    """Return (id, path) of every item marked dirty, in path order."""
+    with lib.transaction() as tx:
+        return tx.query(
+            f"SELECT {Item._table}.id, {Item._table}.path FROM {Item._table} "
+            f"JOIN {Item._flex_table} ON entity_id = {Item._table}.id "
+            f"WHERE key = ? ORDER BY {Item._table}.path",
+            (DIRTY_FIELD,),
+        )
+
+
+def _write_directory(items):
+    """Write the tags of items sharing a directory, one after the other."""
+    written = []
+    failures = []
+    for item in items:
+        try:
+            item.write()
+            written.append(item.id)
+        except Exception as e:
+            failures.append((item, e))
+    return written, failures
+
+
+def _clear_dirty(lib, item_ids):
+    """Remove the dirty markers of items in one transaction."""
+    with lib.transaction() as tx:
+        for start in range(0, len(item_ids), LOAD_CHUNK_SIZE):
+            chunk = item_ids[start:start + LOAD_CHUNK_SIZE]
+            placeholders = ", ".join("?" * len(chunk))
+            tx.mutate(
+                f"DELETE FROM {Item._flex_table} "
+                f"WHERE key = ? AND entity_id IN ({placeholders})",
+                [DIRTY_FIELD, *chunk],
+            )
+
+
+def _flush_dirty(lib, args):
+    """Write the tags of every item a --db-only session left dirty.
+
+    Items are taken in path order and handed to the thread pool one
+    directory at a time, so each worker moves through a single
+    directory while different directories are written in parallel.
+    Only a bounded number of directories is loaded at once. Markers of
+    successfully written items are cleared together at the end, also
+    when interrupted; failed items stay dirty for the next flush. A
+    query limits the flush to matching items.
+    """
+    rows = _dirty_item_rows(lib)
+    if args:
+        wanted = set(_query_item_ids(lib, *parse_query_parts(args, Item)))
+        rows = [row for row in rows if row[0] in wanted]
+    if not rows:
+        ui.print_("No tracks with pending tag writes.")
+        return
+    _write_dirty(lib, rows)
+
+
+def _write_dirty(lib, rows):
+    """Write the tags of dirty items given as path-ordered (id, path) rows."""
+    total = len(rows)
+    ui.print_(f"Writing tags of {total} track(s)...")
+    threads = config['fillmissing']['write_threads'].get(int)
+    written = []
+    failures = []
+    reported = 0
+
+    def collect(futures):
+        nonlocal reported
+        for future in futures:
+            done, failed = future.result()
+            written.extend(done)
+            failures.extend(failed)
+        # Report progress in steps of a tenth
+        progress = (len(written) + len(failures)) * 10 // total
+        if progress > reported:
+            reported = progress
+            ui.print_(f"  {len(written) + len(failures)}/{total} track(s)")
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='fillmissing-flush')
+    running = set()
+    try:
+        directories = itertools.groupby(rows, key=lambda row: os.path.dirname(row[1]))
+        for _, group in directories:
+            if len(running) >= threads * 2:
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                collect(done)
+            items = list(_iter_items(lib, [item_id for item_id, _ in group]))
+            running.add(executor.submit(_write_directory, items))
+        collect(wait(running).done)
+    finally:
+        executor.shutdown(wait=True)
+        _clear_dirty(lib, written)
+        _report_write_failures(failures)
+
+    ui.print_(f"Wrote tags of {len(written)} track(s).")
+
+
+def _report_write_failures(failures):
+    """Print a summary of tag writes that could not be completed."""
+    if not failures:
+        return
+    ui.print_(f"✗ {len(failures)} tag write(s) failed:")
+    for item, e in failures:
+        path = item.path.decode('utf-8', 'replace') if isinstance(item.path, bytes) else item.path
+        ui.print_(f"    {path}: {e}")
+
+
+class MissingFieldsQuery(Query):
+    """Match items where at least one of the given fields is unset.
+
+    A field counts as unset when it is null or holds its type's empty
+    value. Fixed columns are checked on the items table and flexible
+    attributes through the item_attributes table, so the whole filter
+    runs in SQLite.
+    """
+
+    def __init__(self, fields):
+        self.fields = list(fields)
+
+    @property
+    def field_names(self):
+        return set(self.fields)
+
+    def clause(self):
+        clauses = []
+        subvals = []
+        for field in self.fields:
+            if field in Item._fields:
+                column = f"{Item._table}.{field}"
+                clauses.append(f"({column} IS NULL OR {column} = ?)")
+                typ = Item._type(field)
+                subvals.append(typ.to_sql(typ.null))
+            else:
+                clauses.append(
+                    f"NOT EXISTS (SELECT 1 FROM {Item._flex_table} "
+                    f"WHERE entity_id = {Item._table}.id AND key = ? "
+                    "AND value != '')"
+                )
+                subvals.append(field)
+        return " OR ".join(clauses), subvals
+
+    def match(self, obj):
+        return any(not obj.get(field) for field in self.fields)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.fields!r})"
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.fields == other.fields
+
+    def __hash__(self):
+        return hash(tuple(self.fields))
+
+
+# Number of items hydrated per query while streaming the work queue
+LOAD_CHUNK_SIZE = 200
+
+
+def _select_items_sql(query, sort, columns):
+    """Build SQL selecting `columns` of the items matching a query, in order.
+
+    Mirrors beets' own item query, but lets the caller choose what to
+    read. Returns None for queries or sorts that beets can only evaluate
+    in Python (e.g. regexes on flexible attributes).
+    """
+    where, subvals = query.clause()
+    if where is None or sort.is_slow():
+        return None
+
+    table = Item._table
+    source = table
+    if query.field_names & Item.other_db_fields:
+        source += f" {Item.relation_join}"
+    sql = f"SELECT {table}.* FROM ({source}) WHERE {where} GROUP BY {table}.id"
+    source = f"({sql}) {table}"
+    order_by = sort.order_clause()
+    if order_by and _sort_field_names(sort) & Item.other_db_fields:
+        source += f" {Item.relation_join}"
+    sql = f"SELECT {columns} FROM {source}"
+    if order_by:
+        sql += f" ORDER BY {order_by}"
+    return sql, subvals
+
+
+# Sort terms of the --order choices
+QUEUE_ORDERS = {
+    'path': ['path+'],
+    'album': ['albumartist+', 'album+', 'disc+', 'track+'],
+    'added': ['added+'],
+    'id': ['id+'],
+}
+
+
+def _queue_sort(order):
+    """Return the beets sort for an --order choice."""
+    # Case-sensitive, so paths sort byte-wise and each directory's files stay together
+    return sort_from_strings(Item, QUEUE_ORDERS[order], case_insensitive=False)
+
+
+def _query_item_ids(lib, query, sort):
+    """Return the ids of items matching a query, in display order.
+
+    Only the id column is read, straight into a compact array of 64-bit
+    integers, so even huge result sets stay cheap and the count comes
+    for free. Queries that beets can only evaluate in Python fall back
+    to a normal item query.
+    """
+    if not sort:
+        sort = lib.get_default_item_sort()
+
+    select = _select_items_sql(query, sort, f"{Item._table}.id")
+    if select is None:
+        return array('q', (item.id for item in lib.items(query, sort)))
+
+    with lib.transaction():
+        # Transaction.query fetches all rows at once; iterate the cursor instead
+        cursor = lib._connection().execute(*select)
+        return array('q', (row[0] for row in cursor))
+
+
+def _sort_field_names(sort):
+    """Return the fields a sort orders by.
+
+    Sorts only gained `field_names` in beets 2.14, so walk them instead.
+    """
+    if hasattr(sort, 'sorts'):
+        return set().union(*(_sort_field_names(part) for part in sort.sorts))
+    field = getattr(sort, 'field', None)
+    return {field} if field else set()
+
+
+def _iter_items(lib, ids):
+    """Lazily load items for a sequence of ids, a chunk at a time."""
+    for start in range(0, len(ids), LOAD_CHUNK_SIZE):
+        chunk = ids[start:start + LOAD_CHUNK_SIZE]
+        loaded = {item.id: item for item in lib.items(InQuery('id', chunk))}
+        for item_id in chunk:
+            # Items removed since the id query are silently skipped
+            if item_id in loaded:
+                yield loaded[item_id]
+
+
+# Matches offered per Tab press, more than any terminal lists at once
+COMPLETION_LIMIT = 50
+
+
+class ValueIndex:
+    """Frequency-ranked values of one field with prefix completion.
+
+    Values are kept in a case-insensitively sorted array, so the values
+    sharing a prefix form one contiguous slice found by binary search.
+    The most frequent values are cached and kept current as counts
+    change, so showing them at every prompt costs nothing.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = dict(counts or {})
+        self._keys = sorted((value.casefold(), value) for value in self.counts)
+        self._top = None  # (limit, most frequent values), once asked for
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, value, count=1):
+        """Count more (or, with a negative count, fewer) uses of a value."""
+        if value not in self.counts:
+            if count <= 0:
+                return
+            bisect.insort(self._keys, (value.casefold(), value))
+            self.counts[value] = 0
+        self.counts[value] += count
+        if self.counts[value] <= 0:
+            del self.counts[value]
+            del self._keys[bisect.bisect_left(self._keys, (value.casefold(), value))]
+        if self._top is not None:
+            self._update_top(value, count)
+
+    def _rank(self, value):
+        # Ties go to the value that sorts first, as in complete()
+        return (-self.counts[value], value.casefold(), value)
+
+    def _update_top(self, value, count):
+        limit, top = self._top
+        if value in top:
+            if count < 0:
+                # A value further down may have overtaken it
+                self._top = None
+                return
+        elif count > 0 and (len(top) < limit or self._rank(value) < self._rank(top[-1])):
+            if len(top) == limit:
+                top.pop()
+            top.append(value)
+        else:
+            return
+        top.sort(key=self._rank)
+
+    def _range(self, prefix):
+        prefix = prefix.casefold()
+        lo = bisect.bisect_left(self._keys, (prefix,))
+        hi = bisect.bisect_left(self._keys, (prefix + '\U0010ffff',))
+        return lo, hi
+
+    def complete(self, prefix, limit=None):
+        """Return values starting with a prefix, most frequent first."""
+        if not prefix and limit is not None:
+            return self.top(limit)
+        lo, hi = self._range(prefix)
+        values = (value for _, value in self._keys[lo:hi])
+        if limit is None:
+            return sorted(values, key=lambda v: -self.counts[v])
+        return heapq.nlargest(limit, values, key=self.counts.__getitem__)
+
+    def top(self, limit):
+        """Return the most frequent values overall."""
+        if self._top is None or self._top[0] < limit:
+            values = (value for _, value in self._keys)
+            self._top = (limit, heapq.nlargest(limit, values, key=self.counts.__getitem__))
+        return self._top[1][:limit]
+
+
+def _build_value_indexes(lib, field_list):
+    """Build a ValueIndex per field from one aggregate query.
+
+    Fixed columns and flexible attributes are unioned and grouped in
+    SQLite, so no items are loaded to gather the statistics.
+    """
+    parts = []
+    subvals = []
+    flex_fields = []
+    for field in field_list:
+        if field in Item._fields:
+            typ = Item._type(field)
+            parts.append(
+                f"SELECT ? AS key, {field} AS value FROM {Item._table} "
+                f"WHERE {field} IS NOT NULL AND {field} != ?"
+            )
+            subvals.extend([field, typ.to_sql(typ.null)])
+        else:
+            flex_fields.append(field)
+    if flex_fields:
+        placeholders = ", ".join("?" * len(flex_fields))
+        parts.append(
+            f"SELECT key, value FROM {Item._flex_table} "
+            f"WHERE key IN ({placeholders}) AND value != ''"
+        )
+        subvals.extend(flex_fields)
+
+    sql = (
+        f"SELECT key, value, COUNT(*) FROM ({' UNION ALL '.join(parts)}) "
+        "GROUP BY key, value"
+    )
+    indexes = {field: ValueIndex() for field in field_list}
+    with lib.transaction() as tx:
+        for key, value, count in tx.query(sql, subvals):
+            indexes[key].add(str(value), count)
+    return indexes
+
+
+GUESS_GROUPS = ('album_id', 'albumartist')
+
+
+def _build_guesses(lib, field_list):
+    """Return the most common value of each field per album and album artist.
+
+    One aggregate query per grouping column counts the values of fixed
+    columns and flexible attributes together. The result maps
+    ``(group, field, group value)`` to the winning value.
+    """
+    guesses = {}
+    for group in GUESS_GROUPS:
+        parts = []
+        subvals = []
+        flex_fields = []
+        for field in field_list:
+            if field in Item._fields:
+                typ = Item._type(field)
+                parts.append(
+                    f"SELECT ? AS key, {group} AS grp, {field} AS value FROM {Item._table} "
+                    f"WHERE {field} IS NOT NULL AND {field} != ?"
+                )
+                subvals.extend([field, typ.to_sql(typ.null)])
+            else:
+                flex_fields.append(field)
+        if flex_fields:
+            placeholders = ", ".join("?" * len(flex_fields))
+            parts.append(
+                f"SELECT a.key AS key, i.{group} AS grp, a.value AS value FROM {Item._flex_table} a "
+                f"JOIN {Item._table} i ON i.id = a.entity_id "
+                f"WHERE a.key IN ({placeholders}) AND a.value != ''"
+            )
+            subvals.extend(flex_fields)
+
+        # Most votes first within each group, so the first row wins
+        sql = (
+            f"SELECT key, grp, value, COUNT(*) AS votes FROM ({' UNION ALL '.join(parts)}) "
+            "WHERE grp IS NOT NULL AND grp != '' "
+            "GROUP BY key, grp, value ORDER BY key, grp, votes DESC, value"
+        )
+        with lib.transaction() as tx:
+            for key, grp, value, _ in tx.query(sql, subvals):
+                guesses.setdefault((group, key, grp), str(value))
+    return guesses
+
+
+def _guess(guesses, item, field):
+    """Return the value most used by the item's album, else its album artist."""
+    for group in GUESS_GROUPS:
+        value = guesses.get((group, field, item.get(group)))
+        if value is not None:
+            return value
+    return None
+
+
+def _library_signature(lib):
+    """Return a cheap fingerprint that changes whenever the database does.
+
+    Any committed write touches the database file, so its size and
+    modification time tell whether cached statistics are stale. The
+    highest row ids (an index lookup each) also catch writes landing
+    within the file system's timestamp resolution: every new or changed
+    flexible attribute gets a fresh row id.
+    """
+    try:
+        st = os.stat(syspath(lib.path))
+    except OSError:
+        return None  # In-memory or missing database: never cache
+    with lib.transaction() as tx:
+        max_ids = list(tx.query(
+            f"SELECT (SELECT MAX(id) FROM {Item._table}), "
+            f"(SELECT MAX(id) FROM {Item._flex_table})"
+        )[0])
+    return [st.st_mtime_ns, st.st_size] + max_ids
+
+
+def _value_cache_path(lib):
+    """Return where value statistics for a library are cached."""
+    digest = hashlib.sha1(os.fsencode(lib.path)).hexdigest()[:16]
+    return os.path.join(config.config_dir(), 'fillmissing', f'values-{digest}.json')
+
+
+def _read_value_cache(lib):
+    """Return the cached {field: {value: count}} if still current."""
+    signature = _library_signature(lib)
+    if signature is None:
+        return {}
+    try:
+        with open(_value_cache_path(lib)) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('signature') != signature:
+        return {}
+    return cache.get('fields', {})
+
+
+def _data_version(lib):
+    """Return SQLite's counter of commits made by other connections."""
+    with lib.transaction() as tx:
+        return tx.query("PRAGMA data_version")[0][0]
+
+
+class _ValueIndexes(dict):
+    """A ValueIndex per field, with the state of the cache they came from.
+
+    `cached` holds every field of a cache that was current at session
+    start; `data_version` tells whether anyone else wrote since.
+    """
+
+    def __init__(self, indexes=(), cached=None, data_version=None):
+        super().__init__(indexes)
+        self.cached = cached or {}
+        self.data_version = data_version
+
+
+def _load_value_indexes(lib, field_list):
+    """Return a ValueIndex per field, from the cache where possible.
+
+    Only fields missing from a current cache are counted in SQL.
+    """
+    data_version = _data_version(lib)
+    cached = _read_value_cache(lib)
+    indexes = _ValueIndexes(
+        {field: ValueIndex(cached[field]) for field in field_list if field in cached},
+        cached, data_version,
+    )
+    missing = [field for field in field_list if field not in indexes]
+    if missing:
+        indexes.update(_build_value_indexes(lib, missing))
+    return indexes
+
+
+def _save_value_indexes(lib, indexes):
+    """Cache value statistics, stamped with the library's current state.
+
+    Called after the session's own writes, which were applied to the
+    indexes as they happened, so the next start can trust the cache.
+    Other fields of the cache the session started from are kept. If
+    another process wrote to the library meanwhile, the counts may be
+    off, so the cache is dropped instead.
+    """
+    signature = _library_signature(lib)
+    if signature is None:
+        return
+    path = _value_cache_path(lib)
+    data_version = getattr(indexes, 'data_version', None)
+    if data_version is not None and _data_version(lib) != data_version:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    fields = dict(getattr(indexes, 'cached', {}))
+    fields.update({field: index.counts for field, index in indexes.items()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'signature': signature, 'fields': fields}, f)
+    os.replace(tmp_path, path)
+
+
+class _Completer:
+    """Tab completion of field values at the prompt, where available."""
+
+    def __init__(self):
+        try:
+            import readline
+        except ImportError:
+            readline = None
+        self._readline = readline
+        self._saved = None
+        self.index = None
+        self._matches = []
+
+    def __enter__(self):
+        if self._readline is not None:
+            self._saved = (
+                self._readline.get_completer(),
+                self._readline.get_completer_delims(),
+            )
+            # Values may contain spaces, so complete the whole line
+            self._readline.set_completer(self._complete)
+            self._readline.set_completer_delims('')
+            self._readline.parse_and_bind('tab: complete')
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._readline is not None:
+            completer, delims = self._saved
+            self._readline.set_completer(completer)
+            self._readline.set_completer_delims(delims)
+
+    def _complete(self, text, state):
+        if state == 0:
+            self._matches = self.index.complete(text, COMPLETION_LIMIT) if self.index else []
+        if state < len(self._matches):
+            return self._matches[state]
+        return None
+
+
+class _ScriptInput:
+    """Read answers and commands from a script, one per line.
+
+    Stands in for `ui.input_` in headless runs: no prompt is shown, and
+    the end of the script reads like Ctrl+D. A path of '-' reads stdin.
+    """
+
+    def __init__(self, path):
+        if path == '-':
+            self._stream = sys.stdin
+            self._owned = False
+        else:
+            self._stream = open(path, encoding='utf-8')
+            self._owned = True
+
+    def __call__(self, prompt=''):
+        line = self._stream.readline()
+        if not line:
+            raise EOFError
+        return line.rstrip('\r\n')
+
+    def close(self):
+        if self._owned:
+            self._stream.close()
+
+
+def _quiet(*args, **kwargs):
+    """Print nothing; replaces `ui.print_` for per-track output of scripts."""
+
+
+def _group_item_ids(lib, item_ids):
+    """Group ids by album, in order of each album's first appearance.
+
+    Tracks that do not belong to an album form a group of their own.
+    """
+    groups = {}
+    for start in range(0, len(item_ids), LOAD_CHUNK_SIZE):
+        chunk = item_ids[start:start + LOAD_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        with lib.transaction() as tx:
+            rows = tx.query(
+                f"SELECT id, album_id FROM {Item._table} "
+                f"WHERE id IN ({placeholders})",
+                chunk,
+            )
+        album_ids = {item_id: album_id for item_id, album_id in rows}
+        for item_id in chunk:
+            album_id = album_ids.get(item_id)
+            key = ('album', album_id) if album_id else ('item', item_id)
+            groups.setdefault(key, []).append(item_id)
+    return list(groups.values())
+
+
+def _shared_value(items, field):
+    """Return a field's value if all items agree on it, else ''."""
+    value = items[0].get(field, '')
+    if all(other.get(field, '') == value for other in items[1:]):
+        return value
+    return ''
+
+
+def _file_backed_fields(field_list):
+    """Return the fields that are stored in the audio file's tags.
+
+    Everything else (flexible attributes like `mood`) only lives in the
+    database, so editing it never needs a file write.
+    """
+    return {field for field in field_list if field in Item._media_fields}
+
+
+class _SaveContext:
+    """Everything that takes part in saving edits during a session.
+
+    `file_fields` are the edited fields stored in file tags, `writer`
+    the background tag writer, and the value statistics, profiler and
+    undo journal are optional. With `defer_writes`, items are marked
+    dirty instead of written, for a later --flush.
+    """
+
+    def __init__(self, file_fields, writer, value_indexes=None, profiler=None, journal=None,
+                 defer_writes=False):
+        self.file_fields = file_fields
+        self.writer = writer
+        self.defer_writes = defer_writes
+        self.value_indexes = value_indexes if value_indexes is not None else {}
+        self.profiler = profiler or _Profiler()
+        self.journal = journal
+        # Work saved by dropping values that match what is already there
+        self.unchanged = 0
+        self.avoided_stores = 0
+        self.avoided_writes = 0
+        self._held_writes = None
+
+    @contextmanager
+    def transaction(self, lib):
+        """Store the edits made in the block in one transaction.
+
+        Tag writes are held back until it has committed, so files never
+        get ahead of the database, and waiting for a free writer slot
+        never happens while the database lock is held.
+        """
+        self._held_writes = []
+        try:
+            with lib.transaction():
+                yield
+            held = self._held_writes
+        finally:
+            self._held_writes = None
+        for item in held:
+            self.writer.submit(item)
+
+    def queue_write(self, item):
+        """Queue a tag write, or hold it while a transaction is open."""
+        if self._held_writes is None:
+            self.writer.submit(item)
+        else:
+            self._held_writes.append(item)
+
+
+def _is_unchanged(item, field, value):
+    """Return whether `value` equals the field's current value.
+
+    Both sides are compared as the field's beets type, so e.g. '2001'
+    matches a year of 2001. Missing fields never match.
+    """
+    current = item.get(field)
+    if current is None:
+        return False
+    field_type = Item._type(field)
+    try:
+        if isinstance(value, str):
+            value = field_type.parse(value)
+        return field_type.normalize(value) == field_type.normalize(current)
+    except (TypeError, ValueError):
+        return False
+
+
+def _flush_edits(item, pending, save):
+    """Apply buffered field edits to an item with one store and write.
+
+    Values equal to the current ones are dropped first; if nothing is
+    left, the item is neither stored nor written. The database is
+    updated right away; the file is only rewritten, in the background,
+    if one of the changed fields is file-backed. Value statistics are
+    adjusted and changes journaled to match.
+    """
+    if not pending:
+        return
+    edited_file_fields = not save.file_fields.isdisjoint(pending)
+    for field in [field for field, value in pending.items() if _is_unchanged(item, field, value)]:
+        del pending[field]
+        save.unchanged += 1
+    needs_write = not save.file_fields.isdisjoint(pending)
+    if edited_file_fields and not needs_write:
+        save.avoided_writes += 1
+    if not pending:
+        save.avoided_stores += 1
+        return
+    for field, value in pending.items():
+        old_value = item.get(field)
+        index = save.value_indexes.get(field)
+        if index is not None:
+            if old_value:
+                index.add(str(old_value), -1)
+            index.add(value)
+        if save.journal is not None:
+            save.journal.record(item.id, field, old_value, value)
+        item[field] = value
+    pending.clear()
+    if needs_write and save.defer_writes:
+        item[DIRTY_FIELD] = 1
+    if save.journal is not None:
+        # Journal first, so a rollback never misses a stored change
+        save.journal.flush()
+    with save.profiler.phase('store'):
+        item.store()
+    if needs_write and not save.defer_writes:
+        save.queue_write(item)
+
+
+def _flush_group(lib, items, pending, save):
+    """Apply buffered edits to every item of a group.
+
+    All items are stored in a single transaction; their tag writes are
+    queued together on the background writer once it has committed.
+    """
+    if len(items) == 1:
+        _flush_edits(items[0], pending, save)
+        return
+    with save.transaction(lib):
+        for item in items:
+            _flush_edits(item, dict(pending), save)
+    pending.clear()
+
+
+def _flush_ahead(lib, ahead, save):
+    """Save the edits of tracks left behind by going back."""
+    while ahead:
+        _, items, _, pending, _ = ahead.pop()
+        _flush_group(lib, items, pending, save)
+
+
+def _read_import_rows(path):
+    """Stream rows of a CSV or JSON Lines file as dicts.
+
+    Files ending in .jsonl or .ndjson hold one JSON object per line;
+    anything else is read as CSV with a header row. Lines that are not
+    valid JSON objects come out as None. A leading byte order mark, as
+    spreadsheets write it, is skipped.
+    """
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson'):
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield row if isinstance(row, dict) else None
+        else:
+            yield from csv.DictReader(f)
+
+
+def _import_key(row, directory):
+    """Return the ('id', int) or ('path', bytes) key of an import row, or None.
+
+    Relative paths are taken to be inside the library `directory`.
+    """
+    if row is None:
+        return None
+    if row.get('id') not in (None, ''):
+        try:
+            return ('id', int(row['id']))
+        except (TypeError, ValueError):
+            return None
+    if row.get('path'):
+        return ('path', normpath(os.path.join(os.fsdecode(directory), row['path'])))
+    return None
+
+
+def _resolve_import_keys(lib, query, keys):
+    """Load the items for a batch of import keys with one query per key kind."""
+    resolved = {}
+    for kind in ('id', 'path'):
+        values = list({value for key_kind, value in keys if key_kind == kind})
+        if not values:
+            continue
+        # Paths inside the library may be stored relative to it
+        values = [Item._type(kind).to_sql(value) for value in values]
+        for item in lib.items(AndQuery([query, InQuery(kind, values)])):
+            resolved[(kind, item[kind])] = item
+    return resolved
+
+
+def _import_values(lib, path, query, field_list, profiler, db_only=False):
+    """Apply field values from a CSV or JSON Lines file without prompting.
+
+    Rows are keyed by item `id` or `path` and read a chunk at a time:
+    each chunk's keys are resolved with batched queries and its edits are
+    stored in a single transaction, while tag writes run on the
+    background pool. Memory use does not grow with the file size. Only
+    the requested fields are taken from each row; empty cells are left
+    alone.
+    """
+    writer = _TagWriter(config['fillmissing']['write_threads'].get(int), profiler=profiler)
+    journal = _UndoJournal(_undo_dir())
+    save = _SaveContext(
+        _file_backed_fields(field_list), writer, profiler=profiler, journal=journal,
+        defer_writes=db_only,
+    )
+    rows = updated = unmatched = 0
+    try:
+        reader = _read_import_rows(path)
+        while True:
+            with profiler.phase('load'):
+                chunk = list(itertools.islice(reader, LOAD_CHUNK_SIZE))
+            if not chunk:
+                break
+            rows += len(chunk)
+            keys = [_import_key(row, lib.directory) for row in chunk]
+            with profiler.phase('query'):
+                items = _resolve_import_keys(lib, query, [key for key in keys if key])
+            with save.transaction(lib):
+                for row, key in zip(chunk, keys):
+                    item = items.get(key)
+                    if item is None:
+                        unmatched += 1
+                        continue
+                    pending = {
+                        field: row[field] for field in field_list
+                        if row.get(field) not in (None, '')
+                    }
+                    if pending:
+                        _flush_edits(item, pending, save)
+                        updated += 1
+    except (OSError, ValueError, csv.Error) as e:
+        # ValueError covers files that are not UTF-8
+        ui.print_(f"Error: Cannot read import file: {e}")
+        return
+    finally:
+        _finish_saving(save)
+
+    ui.print_(f"Imported {rows} row(s): {updated} updated, {unmatched} unmatched.")
+
+
+# Placeholders of path templates, as in `$language` or `${language}`
+TEMPLATE_FIELD = re.compile(r'\$(?:\{(\w+)\}|(\w+))')
+
+# Paths fetched per query; stays under SQLite's default limit of 999 variables
+RULE_CHUNK_SIZE = 900
+
+
+def _compile_path_rule(pattern):
+    """Compile a path rule to a regex whose named groups are fields.
+
+    Rules with `$field` placeholders are path templates: each
+    placeholder matches one path component and the rest is literal.
+    Anything else is a regular expression.
+    """
+    if not TEMPLATE_FIELD.search(pattern):
+        return re.compile(pattern)
+    parts = []
+    seen = set()
+    end = 0
+    for match in TEMPLATE_FIELD.finditer(pattern):
+        field = match.group(1) or match.group(2)
+        parts.append(re.escape(pattern[end:match.start()]))
+        # A repeated placeholder must match the same text again
+        parts.append(f'(?P={field})' if field in seen else f'(?P<{field}>[^/]+)')
+        seen.add(field)
+        end = match.end()
+    parts.append(re.escape(pattern[end:]))
+    return re.compile(''.join(parts))
+
+
+def _path_rules(field_list):
+    """Compile the configured path rules that can fill any of the fields.
+
+    Raises re.error for a rule that is not a valid pattern.
+    """
+    rules = []
+    for pattern in config['fillmissing']['path_rules'].as_str_seq():
+        try:
+            rule = _compile_path_rule(pattern)
+        except re.error as e:
+            raise re.error(f"{pattern}: {e}") from e
+        if any(field in rule.groupindex for field in field_list):
+            rules.append(rule)
+    return rules
+
+
+def _match_path_rules(rules, path, field_list):
+    """Return the field values the first matching rules give a path.
+
+    Rules are written with '/' between directories on every platform.
+    """
+    path = path.replace(os.sep, '/')
+    values = {}
+    for rule in rules:
+        match = rule.search(path)
+        if match is None:
+            continue
+        for field, value in match.groupdict().items():
+            if value and field in field_list:
+                values.setdefault(field, value)
+    return values
+
+
+def _apply_path_rules(lib, item_ids, rules, field_list, save):
+    """Fill empty fields from the items' paths before prompting.
+
+    Paths are fetched a chunk at a time straight from the database and
+    matched against every rule; only items with a match are loaded, and
+    each chunk's edits are stored in a single transaction. The edits are
+    saved through the session's `save` context, so they share its undo
+    journal and tag writer. Fields that already have a value are never
+    changed. Returns the ids of items left with every field filled.
+    """
+    profiler = save.profiler
+    path_type = Item._type('path')
+    complete = set()
+    values = tracks = 0
+    for start in range(0, len(item_ids), RULE_CHUNK_SIZE):
+        chunk = list(item_ids[start:start + RULE_CHUNK_SIZE])
+        placeholders = ", ".join("?" * len(chunk))
+        with profiler.phase('query'), lib.transaction() as tx:
+            rows = tx.query(
+                f"SELECT id, path FROM {Item._table} WHERE id IN ({placeholders})", chunk
+            )
+
+        matches = {}
+        for item_id, path in rows:
+            found = _match_path_rules(rules, os.fsdecode(path_type.from_sql(path)), field_list)
+            if found:
+                matches[item_id] = found
+        if not matches:
+            continue
+
+        with save.transaction(lib):
+            for item in _iter_items(lib, list(matches)):
+                pending = {
+                    field: value for field, value in matches[item.id].items()
+                    if not item.get(field)
+                }
+                if pending:
+                    values += len(pending)
+                    tracks += 1
+                    _flush_edits(item, pending, save)
+                if all(item.get(field) for field in field_list):
+                    complete.add(item.id)
+
+    ui.print_(f"Filled {values} value(s) on {tracks} track(s) from path rules.")
+    return complete
+
+
+def _query_rules(field_list=None):
+    """Return the configured rules as (query string, {field: value}) pairs.
+
+    Each rule maps a query to `field=value` assignments, split like a
+    shell command line. Given a field list, other fields are dropped.
+    Raises ValueError for an assignment without `=`.
+    """
+    rules = []
+    for query_string, assignments in config['fillmissing']['rules'].get(dict).items():
+        if isinstance(assignments, str):
+            assignments = shlex.split(assignments)
+        values = {}
+        for assignment in assignments:
+            field, sep, value = str(assignment).partition('=')
+            if not sep or not field:
+                raise ValueError(f"{query_string}: expected field=value, got '{assignment}'")
+            if field_list is None or field in field_list:
+                values[field] = value
+        if values:
+            rules.append((query_string, values))
+    return rules
+
+
+def _set_missing(tx, field, value, item_ids, journal):
+    """Set a field on those of the items where it is empty, in bulk.
+
+    Returns the ids that changed. Changes are journaled before the
+    update statement runs.
+    """
+    clause, subvals = MissingFieldsQuery([field]).clause()
+    changed = []
+    for start in range(0, len(item_ids), RULE_CHUNK_SIZE):
+        chunk = list(item_ids[start:start + RULE_CHUNK_SIZE])
+        placeholders = ", ".join("?" * len(chunk))
+        ids = [row[0] for row in tx.query(
+            f"SELECT id FROM {Item._table} WHERE id IN ({placeholders}) AND ({clause})",
+            chunk + subvals,
+        )]
+        if not ids:
+            continue
+        placeholders = ", ".join("?" * len(ids))
+        if field in Item._fields:
+            typ = Item._type(field)
+            for item_id in ids:
+                journal.record(item_id, field, typ.null, value)
+            journal.flush()
+            tx.mutate(
+                f"UPDATE {Item._table} SET {field} = ? WHERE id IN ({placeholders})",
+                [typ.to_sql(typ.parse(value)), *ids],
+            )
+        else:
+            for item_id in ids:
+                journal.record(item_id, field, None, value)
+            journal.flush()
+            # Existing empty attributes are replaced thanks to the unique key
+            tx.mutate(
+                f"INSERT INTO {Item._flex_table} (entity_id, key, value) "
+                f"SELECT id, ?, ? FROM {Item._table} WHERE id IN ({placeholders})",
+                [field, value, *ids],
+            )
+        changed.extend(ids)
+    return changed
+
+
+def _mark_dirty(tx, item_ids):
+    """Mark items as needing a tag write, in bulk."""
+    for start in range(0, len(item_ids), RULE_CHUNK_SIZE):
+        chunk = item_ids[start:start + RULE_CHUNK_SIZE]
+        placeholders = ", ".join("?" * len(chunk))
+        tx.mutate(
+            f"INSERT INTO {Item._flex_table} (entity_id, key, value) "
+            f"SELECT id, ?, '1' FROM {Item._table} WHERE id IN ({placeholders})",
+            [DIRTY_FIELD, *chunk],
+        )
+
+
+def _apply_query_rules(lib, args, field_list=None, db_only=False):
+    """Apply the configured query rules as set-based updates.
+
+    Each rule's ids come from a single query, narrowed to items where
+    one of its fields is empty, and are updated with bulk statements
+    in one transaction per rule; set values are never overwritten, so
+    earlier rules win. Items with a changed tag-backed field are marked
+    dirty and, unless `db_only`, written afterwards in parallel like a
+    --flush.
+    """
+    try:
+        rules = _query_rules(field_list)
+    except ValueError as e:
+        ui.print_(f"Error: Invalid rule: {e}")
+        return
+    if not rules:
+        if field_list is not None and config['fillmissing']['rules'].get(dict):
+            ui.print_("No rule sets any of the requested fields.")
+        else:
+            ui.print_("No rules configured.")
+        return
+
+    user_query, _ = parse_query_parts(args, Item)
+    journal = _UndoJournal(_undo_dir())
+    changed_items = set()
+    to_write = set()
+    try:
+        for query_string, values in rules:
+            rule_query, _ = parse_query_parts(shlex.split(query_string), Item)
+            query = AndQuery([user_query, rule_query, MissingFieldsQuery(values)])
+            item_ids = _query_item_ids(lib, query, None)
+            if not item_ids:
+                continue
+            with lib.transaction() as tx:
+                rule_writes = set()
+                for field, value in values.items():
+                    changed = _set_missing(tx, field, value, item_ids, journal)
+                    changed_items.update(changed)
+                    if _file_backed_fields([field]):
+                        rule_writes.update(changed)
+                _mark_dirty(tx, sorted(rule_writes - to_write))
+                to_write |= rule_writes
+    finally:
+        journal.close()
+
+    ui.print_(
+        f"Applied {len(rules)} rule(s): set {journal.changes} value(s) "
+        f"on {len(changed_items)} track(s)."
+    )
+    if to_write and not db_only:
+        _write_dirty(lib, [row for row in _dirty_item_rows(lib) if row[0] in to_write])
+    _report_undo_hint(journal)
+
+
+# Columns every export row starts with, to recognize the track offline
+EXPORT_COLUMNS = ('id', 'path', 'artist', 'album', 'title')
+
+
+def _export_columns(field_list):
+    return list(EXPORT_COLUMNS) + [field for field in field_list if field not in EXPORT_COLUMNS]
+
+
+def _export_row(columns, values):
+    row = dict(zip(columns, values))
+    row['path'] = os.fsdecode(row['path'])
+    return row
+
+
+def _iter_export_rows(lib, query, sort, field_list):
+    """Yield a dict per matching item with its display fields and field values.
+
+    Fast queries are read straight off a database cursor, with flexible
+    attributes picked up by correlated subqueries, so no Item objects
+    are built and memory use stays flat. Other queries go through
+    normal item loading.
+    """
+    columns = _export_columns(field_list)
+    if not sort:
+        sort = lib.get_default_item_sort()
+
+    table = Item._table
+    selects = []
+    flex_keys = []
+    for column in columns:
+        if column in Item._fields:
+            selects.append(f"{table}.{column}")
+        else:
+            selects.append(
+                f"(SELECT value FROM {Item._flex_table} "
+                f"WHERE entity_id = {table}.id AND key = ?)"
+            )
+            flex_keys.append(column)
+
+    select = _select_items_sql(query, sort, ", ".join(selects))
+    if select is None:
+        for item in lib.items(query, sort):
+            yield _export_row(columns, [item.get(column) for column in columns])
+        return
+
+    sql, subvals = select
+    types = [Item._type(column) if column in Item._fields else None for column in columns]
+    with lib.transaction():
+        # Transaction.query fetches all rows at once; iterate the cursor instead
+        cursor = lib._connection().execute(sql, flex_keys + list(subvals))
+        for values in cursor:
+            # Convert as beets does, e.g. paths stored relative to the library
+            values = [
+                typ.from_sql(value) if typ is not None else value
+                for typ, value in zip(types, values)
+            ]
+            yield _export_row(columns, values)
+
+
+def _export_values(lib, path, query, sort, field_list):
+    """Write the fields of every matching item to a JSON Lines or CSV file.
+
+    The format follows the file extension like for imports, so an
+    edited export can be fed back with --import.
+    """
+    count = 0
+    try:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            rows = _iter_export_rows(lib, query, sort, field_list)
+            if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson'):
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + '\n')
+                    count += 1
+            else:
+                writer = csv.DictWriter(f, fieldnames=_export_columns(field_list))
+                writer.writeheader()
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+    except OSError as e:
+        ui.print_(f"Error: Cannot write export file: {e}")
+        return
+
+    ui.print_(f"Exported {count} track(s) to {path}.")
 
 
 def fillmissing_func(lib, opts, args):
     """Interactively fill missing metadata fields for tracks."""
 
     # Parse arguments
-    query = args
     fields = opts.fields
 
+    if opts.rollback:
+        _rollback_session(lib, opts.rollback)
+        return
+
+    if opts.flush:
+        _flush_dirty(lib, args)
+        return
+
+    if opts.apply_rules:
+        _apply_query_rules(lib, args, fields.split() if fields else None, opts.db_only)
+        return
+
     # Validate fields option
     if not fields:
         ui.print_("Error: Please specify fields with -f option")
@@ -20,52 +1818,213 @@ def fillmissing_func(lib, opts, args):
 
     # Split fields string into list
     field_list = fields.split()
+    file_fields = _file_backed_fields(field_list)
 
-    # Execute query
-    items = lib.items(query)
-    items_list = list(items)
+    try:
+        rules = _path_rules(field_list)
+    except re.error as e:
+        ui.print_(f"Error: Invalid path rule: {e}")
+        return
+
+    profiler = _Profiler(opts.profile or bool(opts.profile_json))
+
+    # Execute query: only ids up front, items are loaded as we go
+    query, sort = parse_query_parts(args, Item)
+    if not sort:
+        # A sort in the query wins over --order
+        sort = _queue_sort(opts.order)
+    if opts.only_missing:
+        query = AndQuery([query, MissingFieldsQuery(field_list)])
 
-    if not items_list:
+    if opts.import_file:
+        _import_values(lib, opts.import_file, query, field_list, profiler, opts.db_only)
+        _report_profile(profiler, opts.profile_json)
+        return
+
+    if opts.export_file:
+        _export_values(lib, opts.export_file, query, sort, field_list)
+        return
+
+    with profiler.phase('query'):
+        item_ids = _query_item_ids(lib, query, sort)
+
+    if not item_ids:
         ui.print_("No items match the query.")
         return
 
-    total_tracks = len(items_list)
+    total_tracks = len(item_ids)
     ui.print_(f"Found {total_tracks} track(s) matching query.")
-    ui.print_("Commands: 'p' = play | 's' = skip track | 'b' = back | Ctrl+C = quit\n")
+
+    # Scripts replace the keyboard and silence the per-track output
+    script = None
+    if opts.script:
+        try:
+            script = _ScriptInput(opts.script)
+        except OSError as e:
+            ui.print_(f"Error: Cannot read script: {e}")
+            return
+
+    # One writer and undo journal for everything the session changes
+    writer = _TagWriter(config['fillmissing']['write_threads'].get(int), profiler=profiler)
+    journal = _UndoJournal(_undo_dir())
+    save = _SaveContext(
+        file_fields, writer, profiler=profiler, journal=journal, defer_writes=opts.db_only,
+    )
+
+    # Fill what the directory layout gives away, then prompt for the rest
+    if rules:
+        complete = _apply_path_rules(lib, item_ids, rules, field_list, save)
+        if opts.only_missing and complete:
+            item_ids = array('q', (item_id for item_id in item_ids if item_id not in complete))
+            total_tracks = len(item_ids)
+            if not item_ids:
+                ui.print_("Nothing left to fill in.")
+                if script is not None:
+                    script.close()
+                _finish_saving(save)
+                _report_profile(profiler, opts.profile_json)
+                return
+            ui.print_(f"{total_tracks} track(s) left to fill in.")
+
+    # Journal progress so an interrupted session can be resumed
+    checkpoint = _Checkpoint(_checkpoint_path(lib, args, field_list))
+    finished_ids, resume_positions = checkpoint.open(len(field_list), opts.resume)
+    if finished_ids or resume_positions:
+        item_ids = array('q', (item_id for item_id in item_ids if item_id not in finished_ids))
+        total_tracks = len(item_ids)
+        ui.print_(f"Resuming: {total_tracks} track(s) left.")
+    elif opts.resume:
+        ui.print_("Nothing to resume, starting from the beginning.")
+
+    # Work on whole albums or on single tracks
+    if opts.album:
+        id_groups = _group_item_ids(lib, item_ids)
+        total_groups = len(id_groups)
+        ui.print_(f"Grouped into {total_groups} album(s).")
+        groups = (list(_iter_items(lib, group)) for group in id_groups)
+    else:
+        total_groups = total_tracks
+        groups = ([item] for item in _iter_items(lib, item_ids))
+    groups = profiler.iterate('load', groups)
+
+    # Known values of each field, for suggestions and completion
+    suggestion_count = config['fillmissing']['suggestions'].get(int)
+    if suggestion_count and script is None:
+        value_indexes = _load_value_indexes(lib, field_list)
+    else:
+        value_indexes = {}
+    save.value_indexes = value_indexes
+    completer = _Completer()
+
+    # Values shared by album mates and the artist's other tracks
+    if config['fillmissing']['guesses'].get(bool) and script is None:
+        guesses = _build_guesses(lib, field_list)
+    else:
+        guesses = {}
+
+    if script is None:
+        read_input, prompt_context, show = ui.input_, completer, ui.print_
+    else:
+        read_input, prompt_context, show = script, nullcontext(), _quiet
+    show("Commands: 'p' = play | '-' = keep field | 's' = skip track | 'b' = back | Ctrl+C = quit\n")
 
     # Iterate through items
-    current_playback = None
+    player = _make_player()
+
+    # Read upcoming tracks ahead so playing them starts without delay
+    prefetch_depth = config['fillmissing']['prefetch']['depth'].get(int)
+    prefetch_budget = config['fillmissing']['prefetch']['budget'].get(int)
+    if prefetch_depth and prefetch_budget > 0 and script is None:
+        prefetcher = _Prefetcher(prefetch_budget)
+    else:
+        prefetcher = None
+        prefetch_depth = 0
+    # Tracks already visited, kept in memory so going back is free
+    history = deque(maxlen=config['fillmissing']['history'].get(int))
+    ahead = []  # Tracks stepped back from, with their unsaved edits
+    revisit = None
+    queue = enumerate(_lookahead(groups, prefetch_depth), 1)
+
+    item = None
+    items = []
+    field_idx = 0
+    pending = {}  # Edits buffered for the current track or album
     try:
-        for idx, item in enumerate(items_list, 1):
+        while True:
+            if revisit is not None:
+                # Going back: the last field of the previous track
+                idx, items, upcoming = revisit
+                revisit = None
+                pending = {}
+                field_idx = len(field_list) - 1
+            elif ahead:
+                # Forward again to where we stepped back from
+                idx, items, upcoming, pending, field_idx = ahead.pop()
+            else:
+                try:
+                    idx, (items, upcoming) = next(queue)
+                except StopIteration:
+                    break
+                pending = {}
+                # Start where a resumed session left this track
+                field_idx = resume_positions.pop(items[0].id, 0)
+
+            # The first track stands in for its album in album mode
+            item = items[0]
+
+            if prefetcher is not None:
+                prefetcher.warm(
+                    member.path for group in [items] + upcoming for member in group
+                )
+
             # Display track info
             title = item.get('title', 'Unknown Title')
             artist = item.get('artist', 'Unknown Artist')
             album = item.get('album', 'Unknown Album')
 
-            ui.print_(f"--- Track {idx} of {total_tracks} ---")
-            ui.print_(f"{artist} - {album} - {title}")
-            ui.print_("")
+            if opts.album:
+                albumartist = item.get('albumartist', '') or artist
+                show(f"--- Album {idx} of {total_groups} ---")
+                show(f"{albumartist} - {album} ({len(items)} track(s))")
+            else:
+                show(f"--- Track {idx} of {total_groups} ---")
+                show(f"{artist} - {album} - {title}")
+            show("")
 
             # Prompt for each field
-            field_idx = 0
             while field_idx < len(field_list):
                 field = field_list[field_idx]
-                current_value = item.get(field, '')
+                current_value = pending.get(field, _shared_value(items, field))
+                # Never guess over values some tracks of an album already have
+                if current_value or any(member.get(field) for member in items):
+                    guess = None
+                else:
+                    guess = _guess(guesses, item, field)
 
                 # Build prompt
                 if current_value:
                     prompt_text = f"  {field} [{current_value}]: "
+                elif guess:
+                    prompt_text = f"  {field} [{guess}?]: "
                 else:
                     prompt_text = f"  {field}: "
 
+                # Show the most common values of the field
+                completer.index = value_indexes.get(field)
+                if completer.index:
+                    top_values = completer.index.top(suggestion_count)
+                    show(f"    ↳ {' | '.join(top_values)}")
+
                 # Get user input
                 try:
-                    user_input = ui.input_(prompt_text)
+                    with prompt_context, profiler.phase('think'):
+                        user_input = read_input(prompt_text)
                 except EOFError:
-                    # Handle Ctrl+D
-                    ui.print_("\n\nExiting.")
-                    if current_playback:
-                        current_playback.terminate()
+                    # Handle Ctrl+D, or the end of a script
+                    ui.print_("\n\nExiting." if script is None else "End of script.")
+                    _flush_group(lib, items, pending, save)
+                    checkpoint.record(item.id, field_idx)
+                    _flush_ahead(lib, ahead, save)
                     return
 
                 # Handle special commands
@@ -73,81 +2032,96 @@ def fillmissing_func(lib, opts, args):
 
                 # Check for playback command
                 if cmd_input == 'p':
-                    # Stop previous playback if any
-                    if current_playback and current_playback.poll() is None:
-                        current_playback.terminate()
-                        current_playback.wait(timeout=1)
-
-                    # Start playback with system default player
+                    if script is not None:
+                        # Nobody is listening to a scripted session
+                        continue
                     file_path = item.path.decode('utf-8') if isinstance(item.path, bytes) else item.path
                     try:
-                        # Determine the command based on OS
-                        system = platform.system()
-                        if system == 'Darwin': # Mac OS X
-                            cmd = ['open', file_path]
-                            current_playback = subprocess.Popen(
-                                cmd,
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL
-                            )
-                        elif system == 'Windows':
-                            current_playback = subprocess.Popen(
-                                f'start "" "{file_path}"',
-                                shell=True,
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL
-                            )
-                        else:  # Linux and others
-                            cmd = ['xdg-open', file_path]
-                            current_playback = subprocess.Popen(
-                                cmd,
-                                stdout=subprocess.DEVNULL,
-                                stderr=subprocess.DEVNULL
-                            )
-                        ui.print_("    ♪ Playing...")
+                        with profiler.phase('play'):
+                            player.play(file_path)
+                        show("    ♪ Playing...")
                     except Exception as e:
-                        ui.print_(f"    ✗ Could not play track: {e}")
+                        show(f"    ✗ Could not play track: {e}")
 
                     # Don't advance field, let user enter value again
                     continue
 
+                # Check for keep field command, which also declines a guess
+                if cmd_input == '-':
+                    pending.pop(field, None)
+                    field_idx += 1
+                    continue
+
                 # Check for skip track command
                 if cmd_input == 's':
-                    ui.print_("    → Skipping track")
+                    show("    → Skipping track")
                     break  # Break out of field loop to next track
 
                 # Check for back command
                 if cmd_input == 'b':
                     if field_idx > 0:
                         field_idx -= 1
-                        ui.print_("    ← Going back")
+                        show("    ← Going back")
                         continue
+                    elif history:
+                        show(f"    ← Back to previous {'album' if opts.album else 'track'}")
+                        ahead.append((idx, items, upcoming, pending, field_idx))
+                        revisit = history.pop()
+                        break
                     else:
-                        ui.print_("    ✗ Already at first field")
+                        show("    ✗ Already at first field")
                         continue
 
                 # Process input
                 if user_input.strip():
-                    # User entered a value - update field
-                    item[field] = user_input.strip()
-                    item.store()
-                    item.write()
-                    ui.print_(f"    → Updated {field}")
+                    # User entered a value - buffer it until leaving the track
+                    pending[field] = user_input.strip()
+                    show(f"    → Updated {field}")
+                elif guess:
+                    # Enter accepts the guess
+                    pending[field] = guess
+                    show(f"    → Updated {field}")
                 # If empty input, skip (keep existing value or leave blank)
 
                 field_idx += 1
 
-            ui.print_("")  # Blank line between tracks
+            if revisit is not None:
+                # Stepped back: the edits stay pending until we return
+                show("")
+                continue
+
+            # Leaving the track (finished or skipped): save buffered edits
+            _flush_group(lib, items, pending, save)
+            for member in items:
+                checkpoint.record(member.id, len(field_list))
+            history.append((idx, items, upcoming))
+            show("")  # Blank line between tracks
 
     except KeyboardInterrupt:
         ui.print_("\n\nInterrupted by user.")
-        if current_playback and current_playback.poll() is None:
-            current_playback.terminate()
+        if item is not None:
+            _flush_group(lib, items, pending, save)
+            checkpoint.record(item.id, field_idx)
+            _flush_ahead(lib, ahead, save)
         return
+    finally:
+        # Never leave a player running behind
+        player.close()
+        if script is not None:
+            script.close()
+        if prefetcher is not None:
+            prefetcher.close()
 
-    # Clean up playback on exit
-    if current_playback and current_playback.poll() is None:
-        current_playback.terminate()
+        # Let queued tag writes finish before leaving
+        _finish_saving(save)
+        checkpoint.close()
+        if value_indexes:
+            _save_value_indexes(lib, value_indexes)
+
+        _report_profile(profiler, opts.profile_json)
+
+    # Every track was visited, so there is nothing left to resume
+    checkpoint.close(finished=True)
 
     ui.print_("Done!")
 
@@ -162,9 +2136,121 @@ fill_missing_command.parser.add_option(
     default='',
     help='space-separated list of fields to populate'
 )
+fill_missing_command.parser.add_option(
+    '--order',
+    dest='order',
+    type='choice',
+    choices=list(QUEUE_ORDERS),
+    default='path',
+    help='order of the tracks: path (default), album, added or id'
+)
+fill_missing_command.parser.add_option(
+    '--only-missing',
+    dest='only_missing',
+    action='store_true',
+    default=False,
+    help='only visit tracks where at least one of the fields is empty'
+)
+fill_missing_command.parser.add_option(
+    '--resume',
+    dest='resume',
+    action='store_true',
+    default=False,
+    help='continue the previous session for the same query and fields'
+)
+fill_missing_command.parser.add_option(
+    '-a', '--album',
+    dest='album',
+    action='store_true',
+    default=False,
+    help='prompt once per album and apply the answers to all its tracks'
+)
+fill_missing_command.parser.add_option(
+    '--script',
+    dest='script',
+    metavar='FILE',
+    default=None,
+    help="read answers and commands from FILE, one per line ('-' for stdin)"
+)
+fill_missing_command.parser.add_option(
+    '--import',
+    dest='import_file',
+    metavar='FILE',
+    default=None,
+    help='set the fields from a CSV or JSON Lines file keyed by id or path, without prompting'
+)
+fill_missing_command.parser.add_option(
+    '--export',
+    dest='export_file',
+    metavar='FILE',
+    default=None,
+    help='write the fields of all matching tracks to a JSON Lines or CSV file instead of prompting'
+)
+fill_missing_command.parser.add_option(
+    '--db-only',
+    dest='db_only',
+    action='store_true',
+    default=False,
+    help='only update the database and mark tracks for a later --flush'
+)
+fill_missing_command.parser.add_option(
+    '--flush',
+    dest='flush',
+    action='store_true',
+    default=False,
+    help='write the tags of all tracks left by --db-only sessions'
+)
+fill_missing_command.parser.add_option(
+    '--apply-rules',
+    dest='apply_rules',
+    action='store_true',
+    default=False,
+    help='fill empty fields of tracks matching the configured rules instead of prompting'
+)
+fill_missing_command.parser.add_option(
+    '--rollback',
+    dest='rollback',
+    metavar='SESSION',
+    default=None,
+    help='undo every change made by an earlier session'
+)
+fill_missing_command.parser.add_option(
+    '--profile',
+    dest='profile',
+    action='store_true',
+    default=False,
+    help='time each phase of the session and print a report at exit'
+)
+fill_missing_command.parser.add_option(
+    '--profile-json',
+    dest='profile_json',
+    metavar='FILE',
+    default=None,
+    help='also write the profile report to FILE as JSON (implies --profile)'
+)
 fill_missing_command.func = fillmissing_func
 
 
 class FillMissingPlugin(BeetsPlugin):
+    def __init__(self):
+        super().__init__()
+        self.config.add({
+            'write_threads': 4,
+            'suggestions': 5,
+            'history': 20,
+            'guesses': True,
+            'path_rules': [],
+            'rules': {},
+            'player': {
+                'command': '',
+                'play': 'loadfile "{path}"',
+                'stop': 'stop',
+            },
+            'prefetch': {
+                'depth': 2,
+                'budget': 64 * 1024 * 1024,
+            },
+        })
+
     def commands(self):
         return [fill_missing_command]
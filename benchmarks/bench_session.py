@@ -0,0 +1,202 @@
+"""Benchmark fillmissing sessions against large synthetic libraries.
+
+For every library size a real beets library is generated in a
+temporary directory, with small WAV files for the tracks the session
+visits. A scripted session then answers one field on the first tracks,
+once for each kind of field, and the script reports:
+
+- time from starting the command to the first prompt
+- peak resident memory of the session
+- store() and write() throughput, from the session's own --profile data
+
+Each session runs in a fresh process so memory figures are not skewed
+by generating the library.
+
+Usage:
+    python benchmarks/bench_session.py
+    python benchmarks/bench_session.py --sizes 10000 --tracks 500 --json results.json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import wave
+
+# Run against this checkout rather than an installed copy of the plugin
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Library sizes generated when none are given
+DEFAULT_SIZES = (10_000, 100_000, 500_000)
+
+# A field of each kind: database-only, and stored in the file's tags
+FIELD_TYPES = {
+    'flexible': 'mood',
+    'file-backed': 'language',
+}
+
+# Items inserted per transaction while generating a library
+INSERT_BATCH_SIZE = 10_000
+
+
+def make_audio(path):
+    """Write a tenth of a second of silence as a mono WAV file."""
+    with wave.open(path, 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(8000)
+        audio.writeframes(b'\0\0' * 800)
+
+
+def build_library(directory, size, tracks):
+    """Create a library of `size` items; only the first `tracks` get audio."""
+    from beets.library import Item, Library
+
+    music = os.path.join(directory, 'music')
+    os.makedirs(music)
+    template = os.path.join(directory, 'template.wav')
+    make_audio(template)
+
+    # A new library reports its schema migrations on stdout
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        lib = Library(os.path.join(directory, 'library.db'), music)
+    for start in range(0, size, INSERT_BATCH_SIZE):
+        with lib.transaction():
+            for i in range(start, min(start + INSERT_BATCH_SIZE, size)):
+                path = os.path.join(music, f'{i:07d}.wav')
+                if i < tracks:
+                    shutil.copyfile(template, path)
+                # Zero-padded names make every queue order follow insertion order
+                Item(
+                    path=os.fsencode(path),
+                    artist=f'Artist {i:07d}',
+                    album=f'Album {i // 10:06d}',
+                    title=f'Track {i:07d}',
+                    track=i % 10 + 1,
+                    format='WAVE',
+                ).add(lib)
+    lib._close()
+
+
+def run_session(directory, field, tracks, results):
+    """Answer `field` on the first `tracks` tracks; runs in a child process."""
+    import resource
+
+    os.environ['BEETSDIR'] = directory
+    from beets import config
+    from beets.library import Library
+    from beetsplug import fillmissing
+
+    config.read(user=False)
+    fillmissing.FillMissingPlugin()
+    lib = Library(os.path.join(directory, 'library.db'), os.path.join(directory, 'music'))
+    profile_path = os.path.join(directory, f'profile-{field}.json')
+    opts, _ = fillmissing.fill_missing_command.parser.parse_args(
+        ['-f', field, '--profile-json', profile_path]
+    )
+
+    started = time.perf_counter()
+    first_prompt = None
+    answered = 0
+
+    def scripted_input(prompt):
+        nonlocal first_prompt, answered
+        if first_prompt is None:
+            first_prompt = time.perf_counter() - started
+        if answered == tracks:
+            raise EOFError
+        answered += 1
+        return f'value {answered % 50}'
+
+    fillmissing.ui.input_ = scripted_input
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        fillmissing.fillmissing_func(lib, opts, [])
+    elapsed = time.perf_counter() - started
+    lib._close()
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak_rss *= 1024
+
+    with open(profile_path, encoding='utf-8') as f:
+        phases = json.load(f)['phases']
+    results.put({
+        'first_prompt': first_prompt,
+        'elapsed': elapsed,
+        'peak_rss': peak_rss,
+        'store_per_s': _throughput(phases.get('store')),
+        'write_per_s': _throughput(phases.get('write')),
+    })
+
+
+def _throughput(stats):
+    """Operations per second spent in a phase, or None if it never ran."""
+    if not stats or not stats['total']:
+        return None
+    return stats['count'] / stats['total']
+
+
+def benchmark(size, tracks):
+    """Generate one library and time a session for every field type."""
+    context = multiprocessing.get_context('spawn')
+    rows = []
+    with tempfile.TemporaryDirectory(prefix='fillmissing-bench-') as directory:
+        started = time.perf_counter()
+        build_library(directory, size, tracks)
+        build_time = time.perf_counter() - started
+
+        for field_type, field in FIELD_TYPES.items():
+            results = context.Queue()
+            process = context.Process(
+                target=run_session, args=(directory, field, tracks, results)
+            )
+            process.start()
+            process.join()
+            if process.exitcode != 0:
+                raise RuntimeError(f"{field_type} session on {size} items failed")
+            row = results.get()
+            row.update(size=size, tracks=tracks, field_type=field_type,
+                       field=field, build_time=build_time)
+            rows.append(row)
+    return rows
+
+
+def _format_rate(rate):
+    return '-' if rate is None else f'{rate:.0f}/s'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='library sizes to generate (default: %(default)s)')
+    parser.add_argument('--tracks', type=int, default=200,
+                        help='tracks answered in each session (default: %(default)s)')
+    parser.add_argument('--json', metavar='FILE',
+                        help='also write the results to FILE as JSON')
+    args = parser.parse_args(argv)
+
+    print(f"{'items':>8} {'field':<12} {'first prompt':>13} {'peak RSS':>10} "
+          f"{'store':>9} {'write':>9}")
+    rows = []
+    for size in args.sizes:
+        for row in benchmark(size, min(args.tracks, size)):
+            rows.append(row)
+            print(f"{row['size']:>8} {row['field_type']:<12} "
+                  f"{row['first_prompt'] * 1000:>10.1f} ms "
+                  f"{row['peak_rss'] / 2**20:>7.1f} MB "
+                  f"{_format_rate(row['store_per_s']):>9} "
+                  f"{_format_rate(row['write_per_s']):>9}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,100 @@
 """Pytest fixtures and configuration for beets-fillmissing tests."""
 
+import os
 import pytest
 from unittest.mock import Mock, MagicMock
 
+from beets import config
+from beets.library import Item
+from beetsplug.fillmissing import FillMissingPlugin, fill_missing_command
+
+
+@pytest.fixture(autouse=True)
+def plugin_config(tmp_path, monkeypatch):
+    """Fresh beets configuration with the plugin's defaults registered."""
+    monkeypatch.setenv('BEETSDIR', str(tmp_path))
+    config.clear()
+    config.read(user=False)
+    FillMissingPlugin()
+    yield config['fillmissing']
+    config.clear()
+
 
 @pytest.fixture
-def mock_lib():
-    """Mock beets library object."""
+def mock_lib(mocker):
+    """Mock beets library object.
+
+    The id-only query needs a real database, so the work queue is fed
+    straight from whatever `lib.items` is set to return, and no value
+    statistics or guesses are loaded or cached.
+    """
     lib = Mock()
     lib.items = Mock()
+    mocker.patch(
+        'beetsplug.fillmissing._query_item_ids',
+        side_effect=lambda lib, query, sort: [item.id for item in lib.items.return_value],
+    )
+    mocker.patch('beetsplug.fillmissing._load_value_indexes', return_value={})
+    mocker.patch('beetsplug.fillmissing._save_value_indexes')
+    mocker.patch('beetsplug.fillmissing._build_guesses', return_value={})
     return lib
 
 
+@pytest.fixture
+def real_lib(tmp_path):
+    """A real, empty beets library stored in a temporary directory."""
+    from beets.library import Library
+    lib = Library(str(tmp_path / 'library.db'), str(tmp_path / 'music'))
+    yield lib
+    lib._close()
+
+
+@pytest.fixture
+def add_item(real_lib):
+    """Factory adding tracks to `real_lib`.
+
+    A track is stored at /music/<title>.mp3 unless a path is given, and
+    gets a numbered title when none is.
+    """
+    def add(title=None, **fields):
+        if title is None:
+            title = f'track{len(real_lib.items())}'
+        path = fields.pop('path', f'/music/{title}.mp3')
+        item = Item(path=os.fsencode(path), title=title, **fields)
+        real_lib.add(item)
+        return item
+    return add
+
+
+@pytest.fixture
+def add_album(real_lib, add_item):
+    """Factory adding an album to `real_lib`.
+
+    `tracks` is a number of tracks or a list with the field values of
+    each. Tracks are numbered, stored under /music/<name>/ and credited
+    to the album artist 'Band' unless fields say otherwise.
+    """
+    def add(name, tracks, **fields):
+        if isinstance(tracks, int):
+            tracks = [{}] * tracks
+        fields = dict({'album': name, 'albumartist': 'Band'}, **fields)
+        items = [
+            add_item(
+                f'{name} {track}', path=f'/music/{name}/{track}.mp3',
+                **dict(fields, track=track, **values),
+            )
+            for track, values in enumerate(tracks, 1)
+        ]
+        real_lib.add_album(items)
+        return items
+    return add
+
+
 @pytest.fixture
 def mock_item():
     """Mock beets item (track) object."""
     item = MagicMock()
+    item.id = 1
     item.path = b'/path/to/track.mp3'
     item.get = Mock(side_effect=lambda key, default='': {
         'title': 'Test Track',
@@ -40,6 +119,7 @@ def mock_items(mock_item):
         items = []
         for i in range(count):
             item = MagicMock()
+            item.id = i + 1
             item.path = f'/path/to/track{i}.mp3'.encode()
             item.get = Mock(side_effect=lambda key, default='', idx=i: {
                 'title': f'Track {idx + 1}',
@@ -61,8 +141,8 @@ def mock_items(mock_item):
 
 @pytest.fixture
 def mock_opts():
-    """Mock command options object."""
-    opts = Mock()
+    """Command options object with every option at its default."""
+    opts, _ = fill_missing_command.parser.parse_args([])
     opts.fields = 'mood context language'
     return opts
 
@@ -76,6 +156,25 @@ def mock_ui(mocker):
     return ui_mock
 
 
+@pytest.fixture
+def printed(mock_ui):
+    """Function returning the lines printed so far through `mock_ui`."""
+    def lines():
+        return [call.args[0] for call in mock_ui.print_.call_args_list if call.args]
+    return lines
+
+
+@pytest.fixture
+def last_session(printed):
+    """Function returning the session named by the last undo hint printed."""
+    def session():
+        for line in reversed(printed()):
+            if str(line).startswith("Undo with: "):
+                return line.rsplit(' ', 1)[1]
+        raise AssertionError("no undo hint printed")
+    return session
+
+
 @pytest.fixture
 def mock_subprocess(mocker):
     """Mock subprocess module."""
@@ -0,0 +1,139 @@
+"""Tests for album-level filling."""
+
+import pytest
+from beets.library import Item
+from unittest.mock import Mock
+from beetsplug.fillmissing import (
+    _SaveContext,
+    _flush_edits,
+    _group_item_ids,
+    _shared_value,
+    fillmissing_func,
+)
+
+
+class TestGroupItemIds:
+    """Test grouping the work queue by album."""
+
+    def test_groups_in_first_appearance_order(self, real_lib, add_album):
+        """Test that album members end up together, albums in queue order."""
+        first = add_album('One', 2)
+        second = add_album('Two', 2)
+        ids = [second[0].id, first[0].id, second[1].id, first[1].id]
+
+        groups = _group_item_ids(real_lib, ids)
+
+        assert groups == [[second[0].id, second[1].id], [first[0].id, first[1].id]]
+
+    def test_singletons_stand_alone(self, real_lib, add_item):
+        """Test that tracks without an album are their own group."""
+        a = add_item('a')
+        b = add_item('b')
+
+        assert _group_item_ids(real_lib, [a.id, b.id]) == [[a.id], [b.id]]
+
+
+class TestSharedValue:
+    """Test the default shown for a group."""
+
+    def test_common_value(self):
+        """Test that a value shared by all tracks is the default."""
+        items = [Item(mood='calm'), Item(mood='calm')]
+
+        assert _shared_value(items, 'mood') == 'calm'
+
+    def test_mixed_values(self):
+        """Test that disagreeing tracks show no default."""
+        items = [Item(mood='calm'), Item(mood='dark')]
+
+        assert _shared_value(items, 'mood') == ''
+
+
+class TestAlbumMode:
+    """Test a session in --album mode."""
+
+    def test_prompts_once_per_album(self, real_lib, add_album, mock_ui, mock_opts):
+        """Test that one answer fills every track of the album."""
+        items = add_album('One', 3)
+        mock_opts.album = True
+        mock_opts.fields = 'mood'
+        mock_ui.input_.side_effect = ['calm']
+
+        fillmissing_func(real_lib, mock_opts, [])
+
+        assert mock_ui.input_.call_count == 1
+        mock_ui.print_.assert_any_call("Band - One (3 track(s))")
+        for item in items:
+            assert real_lib.get_item(item.id).mood == 'calm'
+
+    def test_album_stored_in_one_transaction(self, real_lib, add_album, mock_ui, mock_opts):
+        """Test that all member tracks are committed together."""
+        add_album('One', 3)
+        mock_opts.album = True
+        mock_opts.fields = 'mood'
+        mock_ui.input_.side_effect = ['calm']
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        fillmissing_func(real_lib, mock_opts, [])
+
+        assert statements.count('BEGIN ') == 1
+        assert len(real_lib.items('mood:calm')) == 3
+
+    def test_file_writes_queued_per_track(self, real_lib, add_album, mock_ui, mock_opts, mocker):
+        """Test that file-backed fields are written for every member."""
+        items = add_album('One', 2)
+        writer = mocker.patch('beetsplug.fillmissing._TagWriter').return_value
+        writer.drain.return_value = []
+        mock_opts.album = True
+        mock_opts.fields = 'language'
+        mock_ui.input_.side_effect = ['eng']
+
+        fillmissing_func(real_lib, mock_opts, [])
+
+        written = [c[0][0].id for c in writer.submit.call_args_list]
+        assert written == [item.id for item in items]
+
+    def test_file_writes_queued_after_commit(self, real_lib, add_album, mock_ui, mock_opts, mocker):
+        """Test that no tag write is queued while the album's transaction is open."""
+        add_album('One', 2)
+        writer = mocker.patch('beetsplug.fillmissing._TagWriter').return_value
+        writer.drain.return_value = []
+        in_transaction = []
+        writer.submit.side_effect = lambda item: in_transaction.append(
+            real_lib._connection().in_transaction
+        )
+        mock_opts.album = True
+        mock_opts.fields = 'language'
+        mock_ui.input_.side_effect = ['eng']
+
+        fillmissing_func(real_lib, mock_opts, [])
+
+        assert in_transaction == [False, False]
+
+    def test_failed_transaction_writes_nothing(self, real_lib, add_album):
+        """Test that held writes are dropped when the transaction rolls back."""
+        items = add_album('One', 2)
+        writer = Mock()
+        save = _SaveContext({'language'}, writer)
+
+        with pytest.raises(RuntimeError):
+            with save.transaction(real_lib):
+                for item in items:
+                    _flush_edits(item, {'language': 'eng'}, save)
+                raise RuntimeError
+
+        writer.submit.assert_not_called()
+
+    def test_mixed_singletons_and_albums(self, real_lib, add_item, add_album, mock_ui, mock_opts):
+        """Test that loose tracks are prompted on their own."""
+        add_album('One', 2)
+        add_item('Loose')
+        mock_opts.album = True
+        mock_opts.fields = 'mood'
+        mock_ui.input_.side_effect = ['calm', 'dark']
+
+        fillmissing_func(real_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("Grouped into 2 album(s).")
+        assert len(real_lib.items('mood:calm')) + len(real_lib.items('mood:dark')) == 3
@@ -0,0 +1,159 @@
+"""Tests for --apply-rules and the query rules in the configuration."""
+
+from beets.library import Item
+from beetsplug.fillmissing import DIRTY_FIELD, _rollback_session, fill_missing_command, fillmissing_func
+
+
+def rules_opts(*extra):
+    opts, _ = fill_missing_command.parser.parse_args(['--apply-rules', *extra])
+    return opts
+
+
+class TestApplyRules:
+    """Test set-based rule updates."""
+
+    def test_fills_empty_fields(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that matching tracks get the values where they are empty."""
+        mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'albumartist:Ravi': 'language=hin mood=calm'})
+        empty = add_item('a', albumartist='Ravi Shankar')
+        set_ = add_item('b', albumartist='Ravi Shankar', language='eng', mood='')
+        other = add_item('c', albumartist='Someone')
+
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        assert real_lib.get_item(empty.id).language == 'hin'
+        assert real_lib.get_item(empty.id).mood == 'calm'
+        assert real_lib.get_item(set_.id).language == 'eng'
+        assert real_lib.get_item(set_.id).mood == 'calm'
+        assert real_lib.get_item(other.id).language == ''
+        mock_ui.print_.assert_any_call("Applied 1 rule(s): set 3 value(s) on 2 track(s).")
+
+    def test_earlier_rule_wins(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that a later rule does not overwrite an earlier one."""
+        mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'artist:Ravi': 'language=hin', 'title:a': 'language=eng'})
+        item = add_item('a', artist='Ravi')
+
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        assert real_lib.get_item(item.id).language == 'hin'
+
+    def test_quoted_multi_word_query(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that a quoted value with spaces is one query term."""
+        plugin_config['rules'].set({"albumartist:'Ravi Shankar'": 'language=hin'})
+        ravi = add_item('a', albumartist='Ravi Shankar')
+        other = add_item('Shankar tribute', albumartist='Ravi Kumar')
+
+        fillmissing_func(real_lib, rules_opts('--db-only'), [])
+
+        assert real_lib.get_item(ravi.id).language == 'hin'
+        assert real_lib.get_item(other.id).language == ''
+
+    def test_list_of_assignments(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that values with spaces can be given as a list."""
+        plugin_config['rules'].set({'artist:Ravi': ['mood=very calm']})
+        item = add_item('a', artist='Ravi')
+
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        assert real_lib.get_item(item.id).mood == 'very calm'
+
+    def test_one_transaction_per_rule(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that each rule is written in a single transaction."""
+        plugin_config['rules'].set({'artist:A': 'language=eng mood=calm', 'artist:B': 'mood=party'})
+        for i in range(5):
+            add_item(f'a{i}', artist='A')
+            add_item(f'b{i}', artist='B')
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        fillmissing_func(real_lib, rules_opts('--db-only'), [])
+
+        assert statements.count('BEGIN ') == 2
+
+    def test_writes_changed_files_in_parallel_phase(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that tag-backed changes are written once each, afterwards."""
+        write = mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'artist:A': 'language=eng', 'artist:B': 'mood=party'})
+        add_item('a', artist='A')
+        add_item('b', artist='B')
+
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        # mood is a flexible attribute, so only the language change hits a file
+        assert write.call_count == 1
+        mock_ui.print_.assert_any_call("Wrote tags of 1 track(s).")
+        assert not any(DIRTY_FIELD in item for item in real_lib.items())
+
+    def test_db_only_leaves_tracks_dirty(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that --db-only defers the writes to --flush."""
+        write = mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'artist:A': 'language=eng'})
+        item = add_item('a', artist='A')
+
+        fillmissing_func(real_lib, rules_opts('--db-only'), [])
+
+        write.assert_not_called()
+        assert DIRTY_FIELD in real_lib.get_item(item.id)
+
+    def test_query_narrows_rules(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that a query limits which tracks rules may change."""
+        mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'artist:A': 'language=eng'})
+        inside = add_item('a', artist='A', album='X')
+        outside = add_item('b', artist='A', album='Y')
+
+        fillmissing_func(real_lib, rules_opts(), ['album:X'])
+
+        assert real_lib.get_item(inside.id).language == 'eng'
+        assert real_lib.get_item(outside.id).language == ''
+
+    def test_fields_option_limits_rules(self, real_lib, add_item, mock_ui, plugin_config, mocker):
+        """Test that -f restricts which fields rules set."""
+        plugin_config['rules'].set({'artist:A': 'language=eng mood=calm'})
+        item = add_item('a', artist='A')
+
+        fillmissing_func(real_lib, rules_opts('-f', 'mood'), [])
+
+        assert real_lib.get_item(item.id).mood == 'calm'
+        assert real_lib.get_item(item.id).language == ''
+
+    def test_rollback(self, real_lib, add_item, mock_ui, plugin_config, mocker, last_session):
+        """Test that rule changes are journaled and can be undone."""
+        mocker.patch.object(Item, 'write')
+        plugin_config['rules'].set({'artist:A': 'language=eng mood=calm'})
+        item = add_item('a', artist='A')
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        _rollback_session(real_lib, last_session())
+
+        restored = real_lib.get_item(item.id)
+        assert restored.language == ''
+        assert 'mood' not in restored
+
+    def test_invalid_assignment(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that an assignment without '=' is reported."""
+        plugin_config['rules'].set({'artist:A': 'language'})
+        item = add_item('a', artist='A')
+
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        mock_ui.print_.assert_called_once_with(
+            "Error: Invalid rule: artist:A: expected field=value, got 'language'"
+        )
+        assert real_lib.get_item(item.id).language == ''
+
+    def test_no_rules(self, real_lib, mock_ui):
+        """Test the message when nothing is configured."""
+        fillmissing_func(real_lib, rules_opts(), [])
+
+        mock_ui.print_.assert_called_once_with("No rules configured.")
+
+    def test_no_rule_for_fields(self, real_lib, mock_ui, plugin_config):
+        """Test the message when -f leaves out every rule's fields."""
+        plugin_config['rules'].set({'artist:A': 'language=eng'})
+
+        fillmissing_func(real_lib, rules_opts('-f', 'mood'), [])
+
+        mock_ui.print_.assert_called_once_with("No rule sets any of the requested fields.")
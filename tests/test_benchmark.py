@@ -0,0 +1,30 @@
+"""Smoke test for the benchmark suite, so it keeps working as the code changes."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BENCHMARK = Path(__file__).parent.parent / 'benchmarks' / 'bench_session.py'
+
+
+def test_benchmark_runs_on_small_library(tmp_path):
+    """Test that a tiny benchmark run reports every measurement."""
+    output = tmp_path / 'results.json'
+
+    subprocess.run(
+        [sys.executable, str(BENCHMARK), '--sizes', '20', '--tracks', '3', '--json', str(output)],
+        check=True,
+        capture_output=True,
+        timeout=120,
+    )
+
+    rows = json.loads(output.read_text())
+    assert [row['field_type'] for row in rows] == ['flexible', 'file-backed']
+    for row in rows:
+        assert row['size'] == 20
+        assert row['first_prompt'] > 0
+        assert row['peak_rss'] > 0
+        assert row['store_per_s'] > 0
+    assert rows[0]['write_per_s'] is None
+    assert rows[1]['write_per_s'] > 0
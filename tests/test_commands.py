@@ -238,6 +238,45 @@ class TestBackCommand:
         assert call('context', 'driving') in calls
         assert call('language', 'eng') in calls
 
+    def test_back_to_previous_track(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that 'b' at the first field returns to the previous track."""
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+
+        # Finish track 1, go back from track 2 to its last field, then finish both
+        mock_ui.input_.side_effect = ['', '', '', 'b', 'eng', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("    ← Back to previous track")
+        items[0].__setitem__.assert_any_call('language', 'eng')
+        # The previous track comes from memory, not from the library or its file
+        assert mock_lib.items.call_count == 1
+        items[0].read.assert_not_called()
+
+    def test_edits_kept_when_stepping_back(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that unsaved edits survive a trip to the previous track."""
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+
+        mock_ui.input_.side_effect = ['', '', '', 'calm', 'b', 'b', '', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        items[1].__setitem__.assert_any_call('mood', 'calm')
+        mock_ui.print_.assert_any_call("--- Track 1 of 2 ---")
+
+    def test_history_size_configurable(self, mock_lib, mock_ui, mock_opts, mock_items, plugin_config):
+        """Test that a history of 0 keeps 'b' within the current track."""
+        plugin_config['history'].set(0)
+        mock_lib.items.return_value = mock_items(2)
+
+        mock_ui.input_.side_effect = ['', '', '', 'b', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("    ✗ Already at first field")
+
 
 class TestPathEncoding:
     """Test handling of byte vs string paths."""
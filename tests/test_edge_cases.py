@@ -2,6 +2,7 @@
 
 import pytest
 from unittest.mock import Mock, call
+from beetsplug import fillmissing
 from beetsplug.fillmissing import fillmissing_func
 
 
@@ -150,9 +151,9 @@ class TestSpecialCharacters:
 class TestEdgeCases:
     """Test various edge cases."""
 
-    def test_single_field_option(self, mock_lib, mock_ui, mock_item):
+    def test_single_field_option(self, mock_lib, mock_ui, mock_item, mock_opts):
         """Test with only a single field to fill."""
-        opts = Mock()
+        opts = mock_opts
         opts.fields = 'mood'
         mock_item.get = Mock(return_value='')
         mock_lib.items.return_value = [mock_item]
@@ -163,9 +164,9 @@ class TestEdgeCases:
         
         mock_item.__setitem__.assert_called_once_with('mood', 'happy')
 
-    def test_many_fields(self, mock_lib, mock_ui, mock_item):
+    def test_many_fields(self, mock_lib, mock_ui, mock_item, mock_opts):
         """Test with many fields to fill."""
-        opts = Mock()
+        opts = mock_opts
         opts.fields = 'mood context language genre artist album year'
         mock_item.get = Mock(return_value='')
         mock_lib.items.return_value = [mock_item]
@@ -183,7 +184,7 @@ class TestEdgeCases:
         fillmissing_func(mock_lib, mock_opts, [])
         
         # Should handle empty query
-        mock_lib.items.assert_called()
+        fillmissing._query_item_ids.assert_called_once()
 
     def test_query_with_special_characters(self, mock_lib, mock_ui, mock_opts):
         """Test query with special characters."""
@@ -192,7 +193,8 @@ class TestEdgeCases:
         # Query with quotes and special chars
         fillmissing_func(mock_lib, mock_opts, ["artist:'The Band'"])
         
-        mock_lib.items.assert_called()
+        query = fillmissing._query_item_ids.call_args[0][1]
+        assert 'The Band' in repr(query)
 
     def test_field_with_only_whitespace(self, mock_lib, mock_ui, mock_opts, mock_item):
         """Test that whitespace-only input is treated as empty."""
@@ -219,9 +221,9 @@ class TestEdgeCases:
         
         mock_item.__setitem__.assert_any_call('mood', long_value)
 
-    def test_unknown_field_name(self, mock_lib, mock_ui, mock_item):
+    def test_unknown_field_name(self, mock_lib, mock_ui, mock_item, mock_opts):
         """Test with custom/unknown field names."""
-        opts = Mock()
+        opts = mock_opts
         opts.fields = 'custom_field_xyz'
         mock_item.get = Mock(return_value='')
         mock_lib.items.return_value = [mock_item]
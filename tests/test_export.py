@@ -0,0 +1,129 @@
+"""Tests for exporting field values to JSON Lines and CSV files."""
+
+import csv
+import json
+import os
+from beetsplug.fillmissing import fill_missing_command, fillmissing_func
+
+
+def export_opts(path, fields='mood language', *extra):
+    opts, _ = fill_missing_command.parser.parse_args(['-f', fields, '--export', str(path), *extra])
+    return opts
+
+
+def read_jsonl(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+class TestExport:
+    """Test streaming exports."""
+
+    def test_option_default(self):
+        """Test that nothing is exported unless asked for."""
+        opts, _ = fill_missing_command.parser.parse_args([])
+
+        assert opts.export_file is None
+
+    def test_jsonl_rows(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that each track is a line with display fields and field values."""
+        item = add_item('a', artist='Band', album='Record', mood='calm')
+        output = tmp_path / 'out.jsonl'
+
+        fillmissing_func(real_lib, export_opts(output), [])
+
+        assert read_jsonl(output) == [{
+            'id': item.id,
+            'path': '/music/a.mp3',
+            'artist': 'Band',
+            'album': 'Record',
+            'title': 'a',
+            'mood': 'calm',
+            'language': '',
+        }]
+        mock_ui.input_.assert_not_called()
+        mock_ui.print_.assert_any_call(f"Exported 1 track(s) to {output}.")
+
+    def test_missing_flexible_attribute_is_null(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that an unset flexible attribute is exported as null."""
+        add_item('a')
+        output = tmp_path / 'out.jsonl'
+
+        fillmissing_func(real_lib, export_opts(output), [])
+
+        assert read_jsonl(output)[0]['mood'] is None
+
+    def test_query_and_order(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that only matching tracks are exported, in display order."""
+        b = add_item('b', artist='Beta')
+        a = add_item('a', artist='Alpha')
+        add_item('c', artist='Gamma', mood='calm')
+        output = tmp_path / 'out.jsonl'
+
+        fillmissing_func(real_lib, export_opts(output, 'mood', '--only-missing'), [])
+
+        assert [row['id'] for row in read_jsonl(output)] == [a.id, b.id]
+
+    def test_slow_query(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that queries evaluated in Python export the same columns."""
+        item = add_item('a', mood='happy')
+        add_item('b', mood='sad')
+        output = tmp_path / 'out.jsonl'
+
+        fillmissing_func(real_lib, export_opts(output), ['mood::^ha'])
+
+        rows = read_jsonl(output)
+        assert [row['id'] for row in rows] == [item.id]
+        assert rows[0]['path'] == '/music/a.mp3'
+        assert rows[0]['mood'] == 'happy'
+
+    def test_streams_without_items(self, real_lib, add_item, mock_ui, tmp_path, mocker):
+        """Test that fast queries never build Item objects."""
+        add_item('a', mood='calm')
+        items = mocker.spy(real_lib, 'items')
+
+        fillmissing_func(real_lib, export_opts(tmp_path / 'out.jsonl'), [])
+
+        items.assert_not_called()
+
+    def test_csv_round_trip(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that an edited CSV export can be imported back."""
+        item = add_item('a')
+        output = tmp_path / 'out.csv'
+        fillmissing_func(real_lib, export_opts(output, 'mood'), [])
+
+        with open(output, newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert list(rows[0]) == ['id', 'path', 'artist', 'album', 'title', 'mood']
+        rows[0]['mood'] = 'calm'
+        with open(output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--import', str(output)])
+        fillmissing_func(real_lib, opts, [])
+
+        assert real_lib.get_item(item.id).mood == 'calm'
+
+    def test_paths_inside_library(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that fast and slow queries both export absolute paths that import back."""
+        path = os.path.join(real_lib.directory, b'sub', b'a.mp3')
+        item = add_item('a', path=path, mood='happy')
+        fast, slow = tmp_path / 'fast.jsonl', tmp_path / 'slow.jsonl'
+
+        fillmissing_func(real_lib, export_opts(fast), [])
+        fillmissing_func(real_lib, export_opts(slow), ['mood::^ha'])
+
+        assert read_jsonl(fast)[0]['path'] == read_jsonl(slow)[0]['path'] == os.fsdecode(path)
+
+        fast.write_text(json.dumps({'path': read_jsonl(fast)[0]['path'], 'mood': 'calm'}) + '\n')
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--import', str(fast)])
+        fillmissing_func(real_lib, opts, [])
+
+        assert real_lib.get_item(item.id).mood == 'calm'
+
+    def test_unwritable_file(self, real_lib, mock_ui, tmp_path):
+        """Test that a file that cannot be created is reported."""
+        fillmissing_func(real_lib, export_opts(tmp_path / 'missing' / 'out.jsonl'), [])
+
+        assert mock_ui.print_.call_args.args[0].startswith("Error: Cannot write export file:")
@@ -2,15 +2,17 @@
 
 import pytest
 from unittest.mock import Mock, call
-from beetsplug.fillmissing import fillmissing_func
+from beetsplug import fillmissing
+from beets.library import Item
+from beetsplug.fillmissing import MissingFieldsQuery, fillmissing_func, _file_backed_fields, _is_unchanged
 
 
 class TestBasicFunctionality:
     """Test basic plugin functionality."""
 
-    def test_missing_fields_option_shows_error(self, mock_lib, mock_ui):
+    def test_missing_fields_option_shows_error(self, mock_lib, mock_ui, mock_opts):
         """Test that missing -f option shows an error message."""
-        opts = Mock()
+        opts = mock_opts
         opts.fields = ''
         
         fillmissing_func(mock_lib, opts, [])
@@ -26,9 +28,9 @@ class TestBasicFunctionality:
         
         mock_ui.print_.assert_called_with("No items match the query.")
 
-    def test_field_parsing_splits_on_spaces(self, mock_lib, mock_ui):
+    def test_field_parsing_splits_on_spaces(self, mock_lib, mock_ui, mock_opts):
         """Test that fields are correctly parsed from space-separated string."""
-        opts = Mock()
+        opts = mock_opts
         opts.fields = 'mood context language genre'
         mock_lib.items.return_value = []
         
@@ -75,7 +77,8 @@ class TestFieldUpdates:
         # Verify field was set
         mock_item.__setitem__.assert_any_call('mood', 'chill')
         mock_item.store.assert_called()
-        mock_item.write.assert_called()
+        # mood is a flexible attribute, so the file is left untouched
+        mock_item.write.assert_not_called()
         mock_ui.print_.assert_any_call("    → Updated mood")
 
     def test_update_existing_field(self, mock_lib, mock_ui, mock_opts, mock_item):
@@ -135,8 +138,9 @@ class TestFieldUpdates:
         mock_item.__setitem__.assert_any_call('mood', 'happy')
         mock_item.__setitem__.assert_any_call('context', 'workout')
         mock_item.__setitem__.assert_any_call('language', 'eng')
-        assert mock_item.store.call_count == 3
-        assert mock_item.write.call_count == 3
+        # Edits are flushed once when leaving the track
+        assert mock_item.store.call_count == 1
+        assert mock_item.write.call_count == 1
 
     def test_multiple_tracks_iteration(self, mock_lib, mock_ui, mock_opts, mock_items):
         """Test iterating through multiple tracks."""
@@ -165,3 +169,208 @@ class TestFieldUpdates:
         
         # Should be trimmed
         mock_item.__setitem__.assert_any_call('mood', 'happy')
+
+
+class TestWriteCoalescing:
+    """Test that edits are buffered per track and flushed once."""
+
+    def test_store_deferred_until_track_left(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that no store happens while still prompting the track."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        def answer(prompt):
+            # The first field is already answered but not yet stored
+            if 'context' in prompt:
+                assert mock_item.store.call_count == 0
+            return 'x'
+
+        mock_ui.input_.side_effect = answer
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert mock_item.store.call_count == 1
+
+    def test_back_edits_pending_buffer(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that going back replaces the buffered value before flushing."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', 'b', 'chill', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_item.__setitem__.assert_called_once_with('mood', 'chill')
+        assert mock_item.store.call_count == 1
+
+    def test_back_shows_pending_value_as_default(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that the prompt shows the buffered value after going back."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', 'b', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.input_.assert_any_call("  mood [happy]: ")
+        mock_item.__setitem__.assert_called_once_with('mood', 'happy')
+
+    def test_skip_flushes_pending_edits(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that skipping a track still saves edits entered before."""
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+
+        mock_ui.input_.side_effect = ['happy', 's', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        items[0].__setitem__.assert_called_once_with('mood', 'happy')
+        assert items[0].store.call_count == 1
+        assert items[1].store.call_count == 0
+
+    def test_eof_flushes_pending_edits(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that Ctrl+D saves the current track's edits before exiting."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', EOFError()]
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_item.__setitem__.assert_called_once_with('mood', 'happy')
+        assert mock_item.store.call_count == 1
+
+    def test_interrupt_flushes_pending_edits(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that Ctrl+C saves the current track's edits before exiting."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', 'workout', KeyboardInterrupt()]
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert mock_item.__setitem__.call_count == 2
+        assert mock_item.store.call_count == 1
+
+
+class TestFileBackedFields:
+    """Test that only file-backed fields trigger tag writes."""
+
+    def test_fields_classified(self):
+        """Test that MediaFile fields are told apart from flexible ones."""
+        fields = _file_backed_fields(['mood', 'language', 'title', 'context'])
+
+        assert fields == {'language', 'title'}
+
+    def test_db_only_fields_skip_write(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that editing only flexible attributes never writes the file."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', 'workout', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert mock_item.store.call_count == 1
+        mock_item.write.assert_not_called()
+
+    def test_file_backed_field_triggers_write(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that editing a MediaFile field writes the file once."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['happy', '', 'eng']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert mock_item.store.call_count == 1
+        assert mock_item.write.call_count == 1
+
+
+class TestOnlyMissing:
+    """Test the --only-missing option."""
+
+    def test_adds_missing_fields_filter(self, mock_lib, mock_ui, mock_opts):
+        """Test that the option narrows the query to incomplete tracks."""
+        mock_opts.only_missing = True
+        mock_lib.items.return_value = []
+
+        fillmissing_func(mock_lib, mock_opts, ['artist:Yes'])
+
+        query = fillmissing._query_item_ids.call_args[0][1]
+        assert MissingFieldsQuery(['mood', 'context', 'language']) in query
+
+    def test_off_by_default(self, mock_lib, mock_ui, mock_opts):
+        """Test that without the option the query is left alone."""
+        mock_lib.items.return_value = []
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        query = fillmissing._query_item_ids.call_args[0][1]
+        assert 'MissingFieldsQuery' not in repr(query)
+
+
+class TestUnchangedValues:
+    """Test that retyping the current value causes no I/O."""
+
+    def test_typed_comparison(self):
+        """Test that values are compared as the field's beets type."""
+        item = Item(year=2001, bpm=120, mood='calm', comp=True, rg_track_gain=-1.5)
+
+        assert _is_unchanged(item, 'year', '2001')
+        assert _is_unchanged(item, 'bpm', '120')
+        assert _is_unchanged(item, 'mood', 'calm')
+        assert _is_unchanged(item, 'comp', 'true')
+        assert _is_unchanged(item, 'rg_track_gain', '-1.50')
+        assert not _is_unchanged(item, 'year', '2002')
+        assert not _is_unchanged(item, 'mood', 'Calm')
+
+    def test_missing_field_never_unchanged(self):
+        """Test that setting an absent flexible attribute is always a change."""
+        assert not _is_unchanged(Item(), 'mood', '')
+
+    def test_unparseable_value_is_a_change(self):
+        """Test that values the type cannot parse are passed through."""
+        assert not _is_unchanged(Item(year=2001), 'year', 'soon')
+
+    def test_no_store_or_write(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that a track whose values all match is left untouched."""
+        current = {'mood': 'calm', 'language': 'eng'}
+        mock_item.get = Mock(side_effect=lambda key, default=None: current.get(key, default))
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = ['calm', '', 'eng']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_item.__setitem__.assert_not_called()
+        mock_item.store.assert_not_called()
+        mock_item.write.assert_not_called()
+        mock_ui.print_.assert_any_call(
+            "Skipped 2 unchanged value(s): avoided 1 database store(s) and 1 tag write(s)."
+        )
+
+    def test_only_changed_values_stored(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that a real change is stored without rewriting the unchanged tag."""
+        current = {'mood': 'calm', 'language': 'eng'}
+        mock_item.get = Mock(side_effect=lambda key, default=None: current.get(key, default))
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = ['dark', '', 'eng']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_item.__setitem__.assert_called_once_with('mood', 'dark')
+        mock_item.store.assert_called_once()
+        mock_item.write.assert_not_called()
+        mock_ui.print_.assert_any_call(
+            "Skipped 1 unchanged value(s): avoided 0 database store(s) and 1 tag write(s)."
+        )
+
+    def test_no_summary_without_skips(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that the summary only appears when something was skipped."""
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = ['calm', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        for printed in mock_ui.print_.call_args_list:
+            assert not (printed.args and str(printed.args[0]).startswith("Skipped "))
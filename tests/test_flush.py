@@ -0,0 +1,159 @@
+"""Tests for --db-only sessions and writing their tags with --flush."""
+
+import os
+import wave
+from beets.library import Item
+from beetsplug import fillmissing
+from beetsplug.fillmissing import DIRTY_FIELD, fill_missing_command, fillmissing_func
+
+
+def make_audio(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with wave.open(str(path), 'wb') as audio:
+        audio.setnchannels(1)
+        audio.setsampwidth(2)
+        audio.setframerate(8000)
+        audio.writeframes(b'\0\0' * 80)
+
+
+def add_track(add_item, path, audio=True, **fields):
+    if audio:
+        make_audio(path)
+    return add_item(path.stem, path=path, **fields)
+
+
+def parse(*args):
+    opts, _ = fill_missing_command.parser.parse_args(list(args))
+    return opts
+
+
+def mark_dirty(lib, *items):
+    for item in items:
+        item[DIRTY_FIELD] = 1
+        item.store()
+
+
+class TestDbOnly:
+    """Test sessions that leave the files alone."""
+
+    def test_marks_instead_of_writing(self, real_lib, add_item, mock_ui, tmp_path, mocker):
+        """Test that tag-backed edits are stored and marked dirty, not written."""
+        item = add_track(add_item, tmp_path / 'a.wav')
+        writer = mocker.patch('beetsplug.fillmissing._TagWriter').return_value
+        writer.drain.return_value = []
+        mock_ui.input_.side_effect = ['eng']
+
+        fillmissing_func(real_lib, parse('-f', 'language', '--db-only'), [])
+
+        stored = real_lib.get_item(item.id)
+        assert stored.language == 'eng'
+        assert DIRTY_FIELD in stored
+        writer.submit.assert_not_called()
+
+    def test_database_fields_not_marked(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that edits that never touch tags leave no marker."""
+        item = add_track(add_item, tmp_path / 'a.wav')
+        mock_ui.input_.side_effect = ['calm']
+
+        fillmissing_func(real_lib, parse('-f', 'mood', '--db-only'), [])
+
+        assert DIRTY_FIELD not in real_lib.get_item(item.id)
+
+    def test_import_honours_db_only(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that imports can defer their tag writes too."""
+        item = add_track(add_item, tmp_path / 'a.wav')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,language\n{item.id},eng\n")
+
+        fillmissing_func(real_lib, parse('-f', 'language', '--import', str(csv_file), '--db-only'), [])
+
+        assert DIRTY_FIELD in real_lib.get_item(item.id)
+
+
+class TestFlush:
+    """Test writing the tags of dirty items."""
+
+    def test_writes_and_clears(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that dirty files get their tags and lose the marker."""
+        item = add_track(add_item, tmp_path / 'a.wav', language='eng')
+        mark_dirty(real_lib, item)
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        assert Item.from_path(item.path).language == 'eng'
+        assert DIRTY_FIELD not in real_lib.get_item(item.id)
+        mock_ui.print_.assert_any_call("Wrote tags of 1 track(s).")
+
+    def test_failures_stay_dirty(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that unwritable files are reported and flushed again later."""
+        good = add_track(add_item, tmp_path / 'a.wav', language='eng')
+        bad = add_track(add_item, tmp_path / 'gone.wav', audio=False, language='eng')
+        mark_dirty(real_lib, good, bad)
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        assert DIRTY_FIELD not in real_lib.get_item(good.id)
+        assert DIRTY_FIELD in real_lib.get_item(bad.id)
+        mock_ui.print_.assert_any_call("✗ 1 tag write(s) failed:")
+
+    def test_grouped_by_directory(self, real_lib, add_item, mock_ui, tmp_path, mocker):
+        """Test that each pool task covers exactly one directory."""
+        items = [
+            add_track(add_item, tmp_path / 'b' / '1.wav'),
+            add_track(add_item, tmp_path / 'a' / '2.wav'),
+            add_track(add_item, tmp_path / 'b' / '2.wav'),
+            add_track(add_item, tmp_path / 'a' / '1.wav'),
+        ]
+        mark_dirty(real_lib, *items)
+        spy = mocker.spy(fillmissing, '_write_directory')
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        batches = sorted([os.path.basename(item.path) for item in call.args[0]]
+                         for call in spy.call_args_list)
+        assert batches == [[b'1.wav', b'2.wav'], [b'1.wav', b'2.wav']]
+        dirs = {frozenset(os.path.dirname(item.path) for item in call.args[0])
+                for call in spy.call_args_list}
+        assert all(len(d) == 1 for d in dirs)
+
+    def test_markers_cleared_in_one_transaction(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that all markers are removed in a single commit."""
+        items = [add_track(add_item, tmp_path / f'{i}.wav') for i in range(3)]
+        mark_dirty(real_lib, *items)
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        assert statements.count('BEGIN ') == 1
+        assert not real_lib.items(f'{DIRTY_FIELD}:1')
+
+    def test_query_limits_flush(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that only dirty items matching the query are written."""
+        inside = add_track(add_item, tmp_path / 'a.wav', artist='Yes')
+        outside = add_track(add_item, tmp_path / 'b.wav', artist='No')
+        mark_dirty(real_lib, inside, outside)
+
+        fillmissing_func(real_lib, parse('--flush'), ['artist:Yes'])
+
+        assert DIRTY_FIELD not in real_lib.get_item(inside.id)
+        assert DIRTY_FIELD in real_lib.get_item(outside.id)
+
+    def test_nothing_to_flush(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test the message when no tags are pending."""
+        add_track(add_item, tmp_path / 'a.wav')
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        mock_ui.print_.assert_called_once_with("No tracks with pending tag writes.")
+
+    def test_session_then_flush(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test the whole deferred workflow end to end."""
+        item = add_track(add_item, tmp_path / 'a.wav')
+        mock_ui.input_.side_effect = ['eng']
+        fillmissing_func(real_lib, parse('-f', 'language', '--db-only'), [])
+        assert Item.from_path(item.path).language in (None, '')
+
+        fillmissing_func(real_lib, parse('--flush'), [])
+
+        assert Item.from_path(item.path).language == 'eng'
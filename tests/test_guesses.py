@@ -0,0 +1,125 @@
+"""Tests for prompt defaults guessed from album mates and album artists."""
+
+from beetsplug.fillmissing import _build_guesses, _guess, fill_missing_command, fillmissing_func
+
+
+def session_opts(*extra, fields='language'):
+    opts, _ = fill_missing_command.parser.parse_args(['-f', fields, '--only-missing', *extra])
+    return opts
+
+
+class TestBuildGuesses:
+    """Test the aggregate queries behind the guesses."""
+
+    def test_majority_of_album(self, real_lib, add_album):
+        """Test that the most common value on an album wins."""
+        items = add_album('a', [
+            {'language': 'eng'}, {'language': 'eng'}, {'language': 'fra'}, {},
+        ])
+
+        guesses = _build_guesses(real_lib, ['language'])
+
+        assert _guess(guesses, items[3], 'language') == 'eng'
+
+    def test_flexible_attributes(self, real_lib, add_album):
+        """Test that flexible attributes are counted too."""
+        items = add_album('a', [{'mood': 'calm'}, {}])
+
+        guesses = _build_guesses(real_lib, ['mood'])
+
+        assert _guess(guesses, items[1], 'mood') == 'calm'
+
+    def test_album_artist_fallback(self, real_lib, add_item):
+        """Test that tracks off an album fall back to their album artist."""
+        add_item('a', albumartist='Ravi Shankar', language='hin')
+        add_item('b', albumartist='Ravi Shankar', language='hin')
+        add_item('c', albumartist='Ravi Shankar', language='eng')
+        single = add_item('d', albumartist='Ravi Shankar')
+
+        guesses = _build_guesses(real_lib, ['language', 'mood'])
+
+        assert _guess(guesses, single, 'language') == 'hin'
+        assert _guess(guesses, single, 'mood') is None
+
+    def test_album_before_artist(self, real_lib, add_album, add_item):
+        """Test that the album's vote beats the artist's."""
+        add_item('x', albumartist='A', language='eng')
+        add_item('y', albumartist='A', language='eng')
+        items = add_album('a', [{'language': 'deu'}, {}], albumartist='A')
+
+        guesses = _build_guesses(real_lib, ['language'])
+
+        assert _guess(guesses, items[1], 'language') == 'deu'
+
+    def test_no_guess_without_group(self, real_lib, add_item):
+        """Test that tracks without album or album artist get nothing."""
+        add_item('a', language='eng')
+        lone = add_item('b')
+
+        assert _guess(_build_guesses(real_lib, ['language']), lone, 'language') is None
+
+
+class TestGuessPrompt:
+    """Test guesses in a session."""
+
+    def test_enter_accepts_guess(self, real_lib, add_album, mock_ui):
+        """Test that the guess is shown and taken on Enter."""
+        items = add_album('a', [{'language': 'eng'}, {}])
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        mock_ui.input_.assert_called_once_with("  language [eng?]: ")
+        assert real_lib.get_item(items[1].id).language == 'eng'
+
+    def test_typed_value_wins(self, real_lib, add_album, mock_ui):
+        """Test that typing a value overrides the guess."""
+        items = add_album('a', [{'language': 'eng'}, {}])
+        mock_ui.input_.return_value = 'fra'
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        assert real_lib.get_item(items[1].id).language == 'fra'
+
+    def test_guesses_configurable(self, real_lib, add_album, mock_ui, plugin_config):
+        """Test that guesses can be turned off."""
+        plugin_config['guesses'].set(False)
+        items = add_album('a', [{'language': 'eng'}, {}])
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        mock_ui.input_.assert_called_once_with("  language: ")
+        assert real_lib.get_item(items[1].id).language == ''
+
+    def test_dash_declines_guess(self, real_lib, add_album, mock_ui):
+        """Test that '-' leaves the field alone despite a guess."""
+        items = add_album('a', [{'language': 'eng'}, {}])
+        mock_ui.input_.return_value = '-'
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        assert real_lib.get_item(items[1].id).language == ''
+
+    def test_no_guess_over_album_values(self, real_lib, add_album, mock_ui):
+        """Test that album mode does not guess when some tracks have a value."""
+        items = add_album('a', [{'mood': 'Rock'}, {'mood': 'Rock'}, {'mood': 'Jazz'}, {}])
+        mock_ui.input_.return_value = ''
+
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--album'])
+
+        fillmissing_func(real_lib, opts, [])
+
+        mock_ui.input_.assert_called_once_with("  mood: ")
+        assert [real_lib.get_item(item.id).get('mood', '') for item in items] == ['Rock', 'Rock', 'Jazz', '']
+
+    def test_album_guess_when_all_empty(self, real_lib, add_album, add_item, mock_ui):
+        """Test that an album without values still gets the artist's guess."""
+        add_item('x', albumartist='A', mood='calm')
+        items = add_album('a', [{}, {}], albumartist='A')
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(real_lib, session_opts('--album', fields='mood'), ['album_id:1..'])
+
+        mock_ui.input_.assert_called_once_with("  mood [calm?]: ")
+        assert [real_lib.get_item(item.id).mood for item in items] == ['calm', 'calm']
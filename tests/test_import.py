@@ -0,0 +1,157 @@
+"""Tests for importing field values from CSV and JSON Lines files."""
+
+import json
+import os
+from beetsplug.fillmissing import LOAD_CHUNK_SIZE, fill_missing_command, fillmissing_func
+
+
+def import_opts(path, fields='mood'):
+    opts, _ = fill_missing_command.parser.parse_args(['-f', fields, '--import', str(path)])
+    return opts
+
+
+class TestImport:
+    """Test non-interactive imports."""
+
+    def test_option_default(self):
+        """Test that sessions are interactive unless a file is given."""
+        opts, _ = fill_missing_command.parser.parse_args([])
+
+        assert opts.import_file is None
+
+    def test_csv_keyed_by_id(self, real_lib, add_item, mock_ui, tmp_path, printed):
+        """Test that CSV rows update the items with their ids."""
+        a = add_item('a')
+        b = add_item('b')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,mood\n{a.id},calm\n{b.id},dark\n")
+
+        fillmissing_func(real_lib, import_opts(csv_file), [])
+
+        assert real_lib.get_item(a.id).mood == 'calm'
+        assert real_lib.get_item(b.id).mood == 'dark'
+        mock_ui.input_.assert_not_called()
+        assert printed()[-1] == "Imported 2 row(s): 2 updated, 0 unmatched."
+
+    def test_jsonl_keyed_by_path(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that JSON Lines rows are matched by path."""
+        item = add_item('a')
+        jsonl_file = tmp_path / 'values.jsonl'
+        jsonl_file.write_text(json.dumps({'path': '/music/a.mp3', 'mood': 'happy'}) + '\n')
+
+        fillmissing_func(real_lib, import_opts(jsonl_file), [])
+
+        assert real_lib.get_item(item.id).mood == 'happy'
+
+    def test_paths_inside_library(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that tracks in the library directory match by absolute or relative path."""
+        directory = os.fsdecode(real_lib.directory)
+        a = add_item('a', path=os.path.join(real_lib.directory, b'sub', b'a.mp3'))
+        b = add_item('b', path=os.path.join(real_lib.directory, b'sub', b'b.mp3'))
+        jsonl_file = tmp_path / 'values.jsonl'
+        jsonl_file.write_text(
+            json.dumps({'path': os.path.join(directory, 'sub', 'a.mp3'), 'mood': 'happy'}) + '\n'
+            + json.dumps({'path': os.path.join('sub', 'b.mp3'), 'mood': 'sad'}) + '\n'
+        )
+
+        fillmissing_func(real_lib, import_opts(jsonl_file), [])
+
+        assert real_lib.get_item(a.id).mood == 'happy'
+        assert real_lib.get_item(b.id).mood == 'sad'
+
+    def test_csv_with_byte_order_mark(self, real_lib, add_item, mock_ui, tmp_path, printed):
+        """Test that spreadsheet 'CSV UTF-8' files are keyed by their first column."""
+        item = add_item('a')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,mood\n{item.id},calm\n", encoding='utf-8-sig')
+
+        fillmissing_func(real_lib, import_opts(csv_file), [])
+
+        assert real_lib.get_item(item.id).mood == 'calm'
+        assert printed()[-1] == "Imported 1 row(s): 1 updated, 0 unmatched."
+
+    def test_not_utf8(self, real_lib, add_item, mock_ui, tmp_path, printed):
+        """Test that a file in another encoding is reported, not raised."""
+        item = add_item('a')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_bytes(f"id,mood\n{item.id},d\xe9j\xe0 vu\n".encode('latin-1'))
+
+        fillmissing_func(real_lib, import_opts(csv_file), [])
+
+        assert printed()[-1].startswith("Error: Cannot read import file:")
+
+    def test_only_requested_fields(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that other columns are ignored and empty cells keep the value."""
+        item = add_item('a', context='home')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,title,mood,context\n{item.id},Renamed,calm,\n")
+
+        fillmissing_func(real_lib, import_opts(csv_file, 'mood context'), [])
+
+        stored = real_lib.get_item(item.id)
+        assert stored.title == 'a'
+        assert stored.mood == 'calm'
+        assert stored.context == 'home'
+
+    def test_unmatched_rows_counted(self, real_lib, add_item, mock_ui, tmp_path, printed):
+        """Test that unknown keys, bad lines and keyless rows are reported."""
+        item = add_item('a')
+        jsonl_file = tmp_path / 'values.jsonl'
+        jsonl_file.write_text(
+            json.dumps({'id': item.id, 'mood': 'calm'}) + '\n'
+            + json.dumps({'id': 9999, 'mood': 'calm'}) + '\n'
+            + 'not json\n'
+            + json.dumps({'mood': 'calm'}) + '\n'
+        )
+
+        fillmissing_func(real_lib, import_opts(jsonl_file), [])
+
+        assert printed()[-1] == "Imported 4 row(s): 1 updated, 3 unmatched."
+
+    def test_query_limits_import(self, real_lib, add_item, mock_ui, tmp_path):
+        """Test that rows for items outside the query are not applied."""
+        inside = add_item('a', artist='Yes')
+        outside = add_item('b', artist='No')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,mood\n{inside.id},calm\n{outside.id},calm\n")
+
+        fillmissing_func(real_lib, import_opts(csv_file), ['artist:Yes'])
+
+        assert real_lib.get_item(inside.id).mood == 'calm'
+        assert 'mood' not in real_lib.get_item(outside.id)
+
+    def test_keys_resolved_in_batches(self, real_lib, add_item, mock_ui, tmp_path, mocker):
+        """Test that items are looked up and stored a chunk at a time, not per row."""
+        items = [add_item(str(i)) for i in range(LOAD_CHUNK_SIZE + 1)]
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text("id,mood\n" + ''.join(f"{item.id},calm\n" for item in items))
+        lookups = mocker.spy(real_lib, 'items')
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        fillmissing_func(real_lib, import_opts(csv_file), [])
+
+        assert lookups.call_count == 2
+        assert statements.count('BEGIN ') == 2
+        assert all(item.mood == 'calm' for item in real_lib.items())
+
+    def test_file_backed_fields_written(self, real_lib, add_item, mock_ui, tmp_path, mocker):
+        """Test that tag-backed fields are queued on the background writer."""
+        item = add_item('a')
+        writer_cls = mocker.patch('beetsplug.fillmissing._TagWriter')
+        writer_cls.return_value.drain.return_value = []
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,language,mood\n{item.id},eng,calm\n")
+
+        fillmissing_func(real_lib, import_opts(csv_file, 'language mood'), [])
+
+        written = writer_cls.return_value.submit.call_args.args[0]
+        assert written.id == item.id
+        assert written.language == 'eng'
+        writer_cls.return_value.drain.assert_called_once()
+
+    def test_missing_file(self, real_lib, mock_ui, tmp_path, printed):
+        """Test that an unreadable file is reported."""
+        fillmissing_func(real_lib, import_opts(tmp_path / 'missing.csv'), [])
+
+        assert printed()[-1].startswith("Error: Cannot read import file:")
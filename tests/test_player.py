@@ -0,0 +1,133 @@
+"""Tests for the player backends."""
+
+import shlex
+import sys
+import time
+from unittest.mock import Mock
+from beetsplug.fillmissing import _PersistentPlayer, _SystemPlayer, _make_player, fillmissing_func
+
+
+def echo_player(tmp_path):
+    """A stand-in player that logs every command it receives."""
+    log = tmp_path / 'player.log'
+    script = (
+        "import sys\n"
+        f"with open({str(log)!r}, 'a') as out:\n"
+        "    for line in sys.stdin:\n"
+        "        out.write(line)\n"
+        "        out.flush()\n"
+    )
+    command = f"{shlex.quote(sys.executable)} -c {shlex.quote(script)}"
+    return command, log
+
+
+def wait_for_lines(log, count):
+    for _ in range(100):
+        if log.exists() and len(log.read_text().splitlines()) >= count:
+            break
+        time.sleep(0.02)
+    return log.read_text().splitlines()
+
+
+class TestMakePlayer:
+    """Test picking the backend from the configuration."""
+
+    def test_system_player_by_default(self):
+        """Test that without a command the desktop opener is used."""
+        assert isinstance(_make_player(), _SystemPlayer)
+
+    def test_persistent_player_when_configured(self, plugin_config):
+        """Test that a configured command selects the persistent backend."""
+        plugin_config['player']['command'].set('mpv --idle --input-file=/dev/stdin')
+
+        player = _make_player()
+
+        assert isinstance(player, _PersistentPlayer)
+        assert player.command == ['mpv', '--idle', '--input-file=/dev/stdin']
+        assert player.play_command == 'loadfile "{path}"'
+
+
+class TestPersistentPlayer:
+    """Test the long-lived player process."""
+
+    def test_commands_sent_to_one_process(self, tmp_path):
+        """Test that every track reuses the same player process."""
+        command, log = echo_player(tmp_path)
+        player = _PersistentPlayer(command, 'loadfile "{path}"', 'stop')
+
+        player.play('/music/a.mp3')
+        process = player._process
+        player.stop()
+        player.play('/music/b.mp3')
+
+        assert player._process is process
+        assert wait_for_lines(log, 3) == [
+            'loadfile "/music/a.mp3"', 'stop', 'loadfile "/music/b.mp3"',
+        ]
+        player.close()
+
+    def test_path_quoted_for_player(self, tmp_path):
+        """Test that quotes and backslashes in paths are escaped."""
+        command, log = echo_player(tmp_path)
+        player = _PersistentPlayer(command, 'loadfile "{path}"', 'stop')
+
+        player.play('/music/say "hi" \\ bye.mp3')
+
+        assert wait_for_lines(log, 1) == ['loadfile "/music/say \\"hi\\" \\\\ bye.mp3"']
+        player.close()
+
+    def test_restarts_dead_player(self, tmp_path):
+        """Test that a player that exited is started again on play."""
+        command, log = echo_player(tmp_path)
+        player = _PersistentPlayer(command, 'play {path}', 'stop')
+        player.play('/music/a.mp3')
+        first = player._process
+        first.kill()
+        first.wait()
+
+        player.play('/music/b.mp3')
+
+        assert player._process is not first
+        assert 'play /music/b.mp3' in wait_for_lines(log, 2)
+        player.close()
+
+    def test_close_terminates_process(self, tmp_path):
+        """Test that closing the session leaves no player behind."""
+        command, _ = echo_player(tmp_path)
+        player = _PersistentPlayer(command, 'play {path}', 'stop')
+        player.play('/music/a.mp3')
+        process = player._process
+
+        player.close()
+
+        assert process.poll() is not None
+
+    def test_stop_without_player_is_noop(self):
+        """Test that stop never spawns a player."""
+        player = _PersistentPlayer('does-not-exist', 'play {path}', 'stop')
+
+        player.stop()
+        player.close()
+
+        assert player._process is None
+
+
+class TestPlayerInSession:
+    """Test the session's use of the configured player."""
+
+    def test_play_uses_persistent_player(self, mock_lib, mock_ui, mock_opts, mock_item, mock_subprocess, plugin_config):
+        """Test that 'p' sends the track to the configured player."""
+        subprocess_mock, process = mock_subprocess
+        process.stdin = Mock()
+        plugin_config['player']['command'].set('myplayer --slave')
+        mock_item.path = b'/music/song.mp3'
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = ['p', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert subprocess_mock.Popen.call_args[0][0] == ['myplayer', '--slave']
+        process.stdin.write.assert_any_call('loadfile "/music/song.mp3"\n')
+        mock_ui.print_.assert_any_call("    ♪ Playing...")
+        process.terminate.assert_called()
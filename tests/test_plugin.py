@@ -98,3 +98,25 @@ class TestPluginIntegration:
         
         assert fields_option.help is not None
         assert len(fields_option.help) > 0
+
+    def test_only_missing_option_default_off(self):
+        """Test that --only-missing is a flag that defaults to off."""
+        parser = fill_missing_command.parser
+
+        assert parser.parse_args([])[0].only_missing is False
+        assert parser.parse_args(['--only-missing'])[0].only_missing is True
+
+    def test_resume_option_default_off(self):
+        """Test that --resume is a flag that defaults to off."""
+        parser = fill_missing_command.parser
+
+        assert parser.parse_args([])[0].resume is False
+        assert parser.parse_args(['--resume'])[0].resume is True
+
+    def test_album_option_default_off(self):
+        """Test that -a/--album is a flag that defaults to off."""
+        parser = fill_missing_command.parser
+
+        assert parser.parse_args([])[0].album is False
+        assert parser.parse_args(['-a'])[0].album is True
+        assert parser.parse_args(['--album'])[0].album is True
@@ -0,0 +1,142 @@
+"""Tests for reading upcoming tracks ahead of playback."""
+
+import os
+import time
+from beetsplug.fillmissing import _Prefetcher, _lookahead, fillmissing_func
+
+
+def make_files(tmp_path, sizes):
+    paths = []
+    for i, size in enumerate(sizes):
+        path = tmp_path / f'{i}.flac'
+        path.write_bytes(b'x' * size)
+        paths.append(os.fsencode(path))
+    return paths
+
+
+def wait_for(prefetcher, expected):
+    for _ in range(100):
+        if prefetcher._warmed == expected:
+            break
+        time.sleep(0.02)
+    return prefetcher._warmed
+
+
+class TestLookahead:
+    """Test pairing each group with the ones after it."""
+
+    def test_yields_upcoming_groups(self):
+        """Test that each group comes with the next `depth` groups."""
+        assert list(_lookahead('abcd', 2)) == [
+            ('a', ['b', 'c']), ('b', ['c', 'd']), ('c', ['d']), ('d', []),
+        ]
+
+    def test_depth_zero(self):
+        """Test that no lookahead yields the groups alone."""
+        assert list(_lookahead('ab', 0)) == [('a', []), ('b', [])]
+
+    def test_consumes_lazily(self):
+        """Test that only `depth` groups are pulled ahead of the current one."""
+        pulled = []
+
+        def groups():
+            for group in 'abcde':
+                pulled.append(group)
+                yield group
+
+        iterator = _lookahead(groups(), 1)
+        next(iterator)
+
+        assert pulled == ['a', 'b']
+
+
+class TestPrefetcher:
+    """Test the background read-ahead."""
+
+    def test_reads_whole_files(self, tmp_path):
+        """Test that small files are read completely."""
+        paths = make_files(tmp_path, [100, 200])
+        prefetcher = _Prefetcher(1000)
+
+        prefetcher.warm(paths)
+
+        assert wait_for(prefetcher, {paths[0]: 100, paths[1]: 200}) == {paths[0]: 100, paths[1]: 200}
+        prefetcher.close()
+
+    def test_respects_byte_budget(self, tmp_path):
+        """Test that reading stops once the budget is used up."""
+        paths = make_files(tmp_path, [100, 100, 100])
+        prefetcher = _Prefetcher(250)
+
+        prefetcher.warm(paths)
+
+        expected = {paths[0]: 100, paths[1]: 100, paths[2]: 50}
+        assert wait_for(prefetcher, expected) == expected
+        prefetcher.close()
+
+    def test_already_warmed_bytes_not_read_again(self, tmp_path, mocker):
+        """Test that sliding the window only reads the new track."""
+        paths = make_files(tmp_path, [100, 100, 100])
+        prefetcher = _Prefetcher(1000)
+        prefetcher.warm(paths[:2])
+        wait_for(prefetcher, {paths[0]: 100, paths[1]: 100})
+        read = mocker.spy(os, 'read')
+
+        prefetcher.warm(paths[1:])
+
+        wait_for(prefetcher, {paths[1]: 100, paths[2]: 100})
+        prefetcher.close()
+        assert read.call_count == 1
+
+    def test_missing_files_ignored(self, tmp_path):
+        """Test that unreadable paths do not stop the prefetcher."""
+        paths = [b'/does/not/exist.flac'] + make_files(tmp_path, [100])
+        prefetcher = _Prefetcher(1000)
+
+        prefetcher.warm(paths)
+
+        expected = {paths[0]: 0, paths[1]: 100}
+        assert wait_for(prefetcher, expected) == expected
+        prefetcher.close()
+
+    def test_close_without_requests(self):
+        """Test that closing an unused prefetcher starts no thread."""
+        prefetcher = _Prefetcher(1000)
+
+        prefetcher.close()
+
+        assert prefetcher._thread is None
+
+
+class TestPrefetchInSession:
+    """Test the session's read-ahead requests."""
+
+    def test_warms_current_and_next_tracks(self, mock_lib, mock_ui, mock_opts, mock_items, plugin_config, mocker):
+        """Test that each track requests itself and the tracks after it."""
+        plugin_config['prefetch']['depth'].set(1)
+        prefetcher_cls = mocker.patch('beetsplug.fillmissing._Prefetcher')
+        items = mock_items(3)
+        mock_lib.items.return_value = items
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        requests = [list(call.args[0]) for call in prefetcher_cls.return_value.warm.call_args_list]
+        assert requests == [
+            [items[0].path, items[1].path],
+            [items[1].path, items[2].path],
+            [items[2].path],
+        ]
+        prefetcher_cls.assert_called_once_with(64 * 1024 * 1024)
+        prefetcher_cls.return_value.close.assert_called_once()
+
+    def test_disabled_with_zero_depth(self, mock_lib, mock_ui, mock_opts, mock_item, plugin_config, mocker):
+        """Test that a depth of 0 turns prefetching off."""
+        plugin_config['prefetch']['depth'].set(0)
+        prefetcher_cls = mocker.patch('beetsplug.fillmissing._Prefetcher')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        prefetcher_cls.assert_not_called()
@@ -0,0 +1,139 @@
+"""Tests for session profiling."""
+
+import json
+import time
+from unittest.mock import Mock
+from beetsplug.fillmissing import _Profiler, _percentile, fill_missing_command, fillmissing_func
+
+
+class TestProfiler:
+    """Test collecting and summarizing phase timings."""
+
+    def test_disabled_records_nothing(self):
+        """Test that a disabled profiler keeps no samples."""
+        profiler = _Profiler()
+
+        with profiler.phase('store'):
+            pass
+        assert list(profiler.iterate('load', [1, 2])) == [1, 2]
+
+        assert profiler.samples == {}
+
+    def test_phase_records_duration(self):
+        """Test that a timed block adds one sample to its phase."""
+        profiler = _Profiler(enabled=True)
+
+        with profiler.phase('store'):
+            time.sleep(0.01)
+
+        assert len(profiler.samples['store']) == 1
+        assert profiler.samples['store'][0] >= 0.01
+
+    def test_phase_records_on_error(self):
+        """Test that a failing block is still timed."""
+        profiler = _Profiler(enabled=True)
+
+        try:
+            with profiler.phase('play'):
+                raise OSError('no player')
+        except OSError:
+            pass
+
+        assert len(profiler.samples['play']) == 1
+
+    def test_iterate_times_each_element(self):
+        """Test that producing each element is one sample."""
+        profiler = _Profiler(enabled=True)
+
+        assert list(profiler.iterate('load', 'abc')) == ['a', 'b', 'c']
+        assert len(profiler.samples['load']) == 3
+
+    def test_summary_statistics(self):
+        """Test count, total, percentiles and max of a phase."""
+        profiler = _Profiler(enabled=True)
+        profiler.samples['store'] = [i / 100 for i in range(100, 0, -1)]
+
+        stats = profiler.summary()['phases']['store']
+
+        assert stats['count'] == 100
+        assert abs(stats['total'] - 50.5) < 1e-9
+        assert stats['p50'] == 0.5
+        assert stats['p95'] == 0.95
+        assert stats['max'] == 1.0
+
+    def test_summary_phase_order(self):
+        """Test that phases are reported in session order."""
+        profiler = _Profiler(enabled=True)
+        for name in ['write', 'query', 'think']:
+            profiler.samples[name] = [0.1]
+
+        assert list(profiler.summary()['phases']) == ['query', 'think', 'write']
+
+    def test_percentile_single_sample(self):
+        """Test that one sample is every percentile."""
+        assert _percentile([0.3], 50) == 0.3
+        assert _percentile([0.3], 95) == 0.3
+
+
+class TestProfileOption:
+    """Test --profile in a session."""
+
+    def test_options_default_off(self):
+        """Test that profiling is off unless asked for."""
+        opts, _ = fill_missing_command.parser.parse_args([])
+
+        assert opts.profile is False
+        assert opts.profile_json is None
+
+    def test_report_printed(self, mock_lib, mock_ui, mock_opts, mock_item, mock_subprocess, mock_platform):
+        """Test that every phase of the session shows up in the report."""
+        mock_platform.system.return_value = 'Linux'
+        mock_opts.profile = True
+        mock_opts.fields = 'title'
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = ['p', 'New Title']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        lines = [call.args[0] for call in mock_ui.print_.call_args_list if call.args]
+        report = lines.index(next(line for line in lines if line.startswith("Profile (")))
+        phases = [line.split()[0] for line in lines[report + 2:report + 8]]
+        assert phases == ['query', 'load', 'think', 'store', 'write', 'play']
+        assert lines.index("Done!") > report
+
+    def test_no_report_by_default(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that sessions without --profile print no report."""
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        for call in mock_ui.print_.call_args_list:
+            assert not (call.args and str(call.args[0]).startswith("Profile ("))
+
+    def test_json_dump(self, mock_lib, mock_ui, mock_opts, mock_items, tmp_path):
+        """Test that --profile-json writes the statistics for later comparison."""
+        output = tmp_path / 'profile.json'
+        mock_opts.profile_json = str(output)
+        mock_lib.items.return_value = mock_items(2)
+        mock_ui.input_.return_value = 'calm'
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        data = json.loads(output.read_text())
+        assert data['wall'] > 0
+        assert data['phases']['think']['count'] == 6
+        assert data['phases']['store']['count'] == 2
+        assert set(data['phases']['store']) == {'count', 'total', 'p50', 'p95', 'max'}
+
+    def test_report_on_interrupt(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that an interrupted session still reports its timings."""
+        mock_opts.profile = True
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.side_effect = KeyboardInterrupt()
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        lines = [call.args[0] for call in mock_ui.print_.call_args_list if call.args]
+        assert any(line.startswith("Profile (") for line in lines)
@@ -0,0 +1,247 @@
+"""Tests for building and streaming the work queue from a real library."""
+
+from array import array
+from beets.dbcore.query import AndQuery
+from beets.library import Item, parse_query_parts
+from beetsplug import fillmissing
+from beetsplug.fillmissing import (
+    LOAD_CHUNK_SIZE,
+    MissingFieldsQuery,
+    _iter_items,
+    _query_item_ids,
+    _queue_sort,
+    fill_missing_command,
+    fillmissing_func,
+)
+
+
+def query_ids(lib, args):
+    return list(_query_item_ids(lib, *parse_query_parts(args, Item)))
+
+
+class TestQueryItemIds:
+    """Test the id-only work queue query."""
+
+    def test_returns_ids_of_matching_items(self, real_lib, add_item):
+        """Test that only matching items are returned."""
+        a = add_item(title='a', artist='Yes')
+        add_item(title='b', artist='No')
+        c = add_item(title='c', artist='Yes')
+
+        assert sorted(query_ids(real_lib, ['artist:Yes'])) == [a.id, c.id]
+
+    def test_uses_default_sort_order(self, real_lib, add_item):
+        """Test that ids come back in beets' usual display order."""
+        b = add_item(title='b', artist='Beta', track=1)
+        a2 = add_item(title='a2', artist='Alpha', track=2)
+        a1 = add_item(title='a1', artist='Alpha', track=1)
+
+        assert query_ids(real_lib, []) == [a1.id, a2.id, b.id]
+
+    def test_explicit_sort_in_query(self, real_lib, add_item):
+        """Test that a sort term in the query is honoured."""
+        a = add_item(title='a', year=2001)
+        b = add_item(title='b', year=1999)
+
+        assert query_ids(real_lib, ['year+']) == [b.id, a.id]
+
+    def test_album_field_query(self, real_lib, add_item):
+        """Test queries on album-only fields that need the albums join."""
+        item = add_item(title='a', album='X')
+        add_item(title='b', album='Y')
+        album = real_lib.add_album([item])
+        album.artpath = b'/music/cover.jpg'
+        album.store()
+
+        # Substring matching of paths differs between beets releases
+        assert query_ids(real_lib, ['artpath:/music/cover.jpg']) == [item.id]
+
+    def test_slow_flexible_attribute_query(self, real_lib, add_item):
+        """Test that Python-side queries still produce the right ids."""
+        a = add_item(title='a', mood='happy')
+        add_item(title='b')
+
+        assert query_ids(real_lib, ['mood::^ha']) == [a.id]
+
+    def test_compact_id_array(self, real_lib, add_item):
+        """Test that ids are returned as an array of 64-bit integers."""
+        add_item(title='a')
+
+        ids = _query_item_ids(real_lib, *parse_query_parts([], Item))
+
+        assert isinstance(ids, array)
+        assert ids.typecode == 'q'
+
+    def test_no_matches(self, real_lib, add_item):
+        """Test that an empty result is an empty list."""
+        add_item(title='a')
+
+        assert query_ids(real_lib, ['title:zzz']) == []
+
+
+class TestIterItems:
+    """Test lazy loading of items by id."""
+
+    def test_preserves_id_order(self, real_lib, add_item):
+        """Test that items are yielded in the order of the id list."""
+        items = [add_item(title=str(i)) for i in range(5)]
+        ids = [items[3].id, items[0].id, items[4].id]
+
+        assert [item.id for item in _iter_items(real_lib, ids)] == ids
+
+    def test_loads_in_chunks(self, real_lib, add_item, mocker):
+        """Test that items are queried a chunk at a time, not all at once."""
+        items = [add_item(title=str(i)) for i in range(LOAD_CHUNK_SIZE + 5)]
+        spy = mocker.spy(real_lib, 'items')
+
+        iterator = _iter_items(real_lib, [item.id for item in items])
+        next(iterator)
+        assert spy.call_count == 1
+
+        assert len(list(iterator)) == LOAD_CHUNK_SIZE + 4
+        assert spy.call_count == 2
+
+    def test_loads_flexible_attributes(self, real_lib, add_item):
+        """Test that loaded items carry their flexible attributes."""
+        item = add_item(title='a', mood='calm')
+
+        loaded = next(_iter_items(real_lib, [item.id]))
+
+        assert loaded.mood == 'calm'
+
+    def test_skips_removed_items(self, real_lib, add_item):
+        """Test that ids of items deleted meanwhile are skipped."""
+        a = add_item(title='a')
+        b = add_item(title='b')
+        ids = [a.id, b.id]
+        a.remove()
+
+        assert [item.id for item in _iter_items(real_lib, ids)] == [b.id]
+
+
+class TestMissingFieldsQuery:
+    """Test the SQL filter behind --only-missing."""
+
+    def missing_ids(self, lib, fields, args=()):
+        query, sort = parse_query_parts(list(args), Item)
+        query = AndQuery([query, MissingFieldsQuery(fields)])
+        return sorted(_query_item_ids(lib, query, sort))
+
+    def test_runs_in_sql(self):
+        """Test that the filter produces a WHERE clause for flex and fixed fields."""
+        clause, subvals = MissingFieldsQuery(['mood', 'language']).clause()
+
+        assert clause is not None
+        assert 'item_attributes' in clause
+        assert subvals == ['mood', '']
+
+    def test_flexible_attribute_missing(self, real_lib, add_item):
+        """Test that items without the flexible attribute match."""
+        missing = add_item(title='a')
+        add_item(title='b', mood='calm')
+
+        assert self.missing_ids(real_lib, ['mood']) == [missing.id]
+
+    def test_flexible_attribute_empty(self, real_lib, add_item):
+        """Test that an empty flexible attribute counts as missing."""
+        empty = add_item(title='a', mood='')
+
+        assert self.missing_ids(real_lib, ['mood']) == [empty.id]
+
+    def test_fixed_field_empty(self, real_lib, add_item):
+        """Test that empty fixed columns match."""
+        missing = add_item(title='a')
+        add_item(title='b', language='eng')
+
+        assert self.missing_ids(real_lib, ['language']) == [missing.id]
+
+    def test_any_field_missing(self, real_lib, add_item):
+        """Test that one missing field out of several is enough."""
+        complete = add_item(title='a', mood='calm', language='eng')
+        no_mood = add_item(title='b', language='eng')
+        no_language = add_item(title='c', mood='calm')
+
+        ids = self.missing_ids(real_lib, ['mood', 'language'])
+
+        assert ids == sorted([no_mood.id, no_language.id])
+        assert complete.id not in ids
+
+    def test_combined_with_user_query(self, real_lib, add_item):
+        """Test that the filter narrows the user's query."""
+        match = add_item(title='a', artist='Yes')
+        add_item(title='b', artist='No')
+        add_item(title='c', artist='Yes', mood='calm')
+
+        assert self.missing_ids(real_lib, ['mood'], ['artist:Yes']) == [match.id]
+
+    def test_python_match_agrees(self, real_lib, add_item):
+        """Test that the Python fallback gives the same answer as SQL."""
+        query = MissingFieldsQuery(['mood'])
+
+        assert query.match(add_item(title='a'))
+        assert not query.match(add_item(title='b', mood='calm'))
+
+
+class TestQueueOrder:
+    """Test --order of the work queue."""
+
+    def ordered_ids(self, lib, order):
+        query, _ = parse_query_parts([], Item)
+        return list(_query_item_ids(lib, query, _queue_sort(order)))
+
+    def test_path_order(self, real_lib, add_item):
+        """Test that tracks are grouped by directory, byte-wise."""
+        b = add_item(title='b', path=b'/music/b/1.mp3')
+        upper = add_item(title='B', path=b'/music/B/1.mp3')
+        a = add_item(title='a', path=b'/music/a/2.mp3')
+        a1 = add_item(title='a1', path=b'/music/a/1.mp3')
+
+        assert self.ordered_ids(real_lib, 'path') == [upper.id, a1.id, a.id, b.id]
+
+    def test_album_order(self, real_lib, add_item):
+        """Test that tracks follow album artist, album, disc and track."""
+        two = add_item(title='2', albumartist='X', album='One', track=2)
+        other = add_item(title='o', albumartist='A', album='Two', track=1)
+        one = add_item(title='1', albumartist='X', album='One', track=1)
+
+        assert self.ordered_ids(real_lib, 'album') == [other.id, one.id, two.id]
+
+    def test_added_and_id_order(self, real_lib, add_item):
+        """Test ordering by date added and by id."""
+        late = add_item(title='late')
+        early = add_item(title='early')
+        # Adding an item stamps the current time, so set it afterwards
+        late.added, early.added = 200.0, 100.0
+        late.store()
+        early.store()
+
+        assert self.ordered_ids(real_lib, 'added') == [early.id, late.id]
+        assert self.ordered_ids(real_lib, 'id') == [late.id, early.id]
+
+    def test_path_is_default(self):
+        """Test that sessions walk the library in path order by default."""
+        opts, _ = fill_missing_command.parser.parse_args([])
+
+        assert opts.order == 'path'
+
+    def test_sort_in_query_wins(self, real_lib, add_item, mock_ui, mocker):
+        """Test that an explicit sort term is used instead of --order."""
+        spy = mocker.spy(fillmissing, '_query_item_ids')
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--order', 'id'])
+        add_item(title='a')
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(real_lib, opts, ['year-'])
+
+        assert 'year' in spy.call_args.args[2].order_clause()
+
+    def test_order_option_used(self, real_lib, add_item, mock_ui, mocker):
+        """Test that without a sort term the --order choice applies."""
+        spy = mocker.spy(fillmissing, '_query_item_ids')
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--order', 'added'])
+        add_item(title='a')
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(real_lib, opts, [])
+
+        assert 'added' in spy.call_args.args[2].order_clause()
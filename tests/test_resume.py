@@ -0,0 +1,142 @@
+"""Tests for resumable sessions."""
+
+import os
+from unittest.mock import Mock
+from beetsplug.fillmissing import fillmissing_func, _Checkpoint
+
+
+def printed(mock_ui):
+    return ' '.join(str(call) for call in mock_ui.print_.call_args_list)
+
+
+class TestCheckpoint:
+    """Test the checkpoint journal itself."""
+
+    def test_records_are_appended(self, tmp_path):
+        """Test that each recorded step becomes one journal line."""
+        checkpoint = _Checkpoint(str(tmp_path / 'cp' / 'session.checkpoint'))
+        checkpoint.open(3, resume=False)
+        checkpoint.record(5, 3)
+        checkpoint.record(9, 1)
+        checkpoint.close()
+
+        with open(checkpoint.path) as f:
+            assert f.read() == "5 3\n9 1\n"
+
+    def test_load_splits_finished_and_partial(self, tmp_path):
+        """Test that the journal is read back into finished and partial tracks."""
+        path = tmp_path / 'session.checkpoint'
+        path.write_text("1 3\n2 1\n3 0\n2 3\n4 2\n")
+
+        finished, partial = _Checkpoint(str(path)).open(3, resume=True)
+
+        assert finished == {1, 2}
+        assert partial == {4: 2}
+
+    def test_torn_line_ignored(self, tmp_path):
+        """Test that a half-written last line does not break resuming."""
+        path = tmp_path / 'session.checkpoint'
+        path.write_text("1 3\n2")
+
+        finished, partial = _Checkpoint(str(path)).open(3, resume=True)
+
+        assert finished == {1}
+        assert partial == {}
+
+    def test_fresh_session_truncates(self, tmp_path):
+        """Test that starting without resuming discards the old journal."""
+        path = tmp_path / 'session.checkpoint'
+        path.write_text("1 3\n")
+
+        checkpoint = _Checkpoint(str(path))
+        assert checkpoint.open(3, resume=False) == (set(), {})
+        checkpoint.close()
+
+        assert path.read_text() == ""
+
+    def test_finished_session_removes_journal(self, tmp_path):
+        """Test that a completed session leaves nothing to resume."""
+        path = tmp_path / 'session.checkpoint'
+        checkpoint = _Checkpoint(str(path))
+        checkpoint.open(3, resume=False)
+        checkpoint.close(finished=True)
+
+        assert not path.exists()
+
+
+class TestResume:
+    """Test resuming an interrupted session."""
+
+    def test_resume_skips_finished_tracks(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that --resume starts at the first unfinished track."""
+        items = mock_items(3)
+        mock_lib.items.return_value = items
+
+        # Finish the first track, then quit on the second
+        mock_ui.input_.side_effect = ['', '', '', EOFError()]
+        fillmissing_func(mock_lib, mock_opts, ['artist:x'])
+
+        mock_ui.reset_mock()
+        mock_opts.resume = True
+        mock_ui.input_.side_effect = ['', '', '', '', '', '']
+        fillmissing_func(mock_lib, mock_opts, ['artist:x'])
+
+        output = printed(mock_ui)
+        assert "Resuming: 2 track(s) left." in output
+        assert 'Track 1 of 2' in output
+        assert 'Artist 1' not in output
+        assert 'Artist 2' in output
+
+    def test_resume_continues_at_field(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that a track left mid-way resumes at the next field."""
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+
+        mock_ui.input_.side_effect = ['happy', 'work', KeyboardInterrupt()]
+        fillmissing_func(mock_lib, mock_opts, [])
+        items[0].__setitem__.assert_any_call('context', 'work')
+
+        mock_ui.reset_mock()
+        mock_opts.resume = True
+        mock_ui.input_.side_effect = ['eng', '', '', '']
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert mock_ui.input_.call_args_list[0][0][0].startswith("  language")
+        items[0].__setitem__.assert_any_call('language', 'eng')
+
+    def test_resume_without_checkpoint(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that --resume with no journal starts from the beginning."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_opts.resume = True
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("Nothing to resume, starting from the beginning.")
+        mock_ui.print_.assert_any_call("Done!")
+
+    def test_checkpoint_is_per_query(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that a different query does not pick up another session."""
+        mock_lib.items.return_value = mock_items(2)
+
+        mock_ui.input_.side_effect = ['', '', '', EOFError()]
+        fillmissing_func(mock_lib, mock_opts, ['artist:x'])
+
+        mock_ui.reset_mock()
+        mock_opts.resume = True
+        mock_ui.input_.side_effect = EOFError()
+        fillmissing_func(mock_lib, mock_opts, ['artist:y'])
+
+        mock_ui.print_.assert_any_call("Nothing to resume, starting from the beginning.")
+
+    def test_completed_session_clears_checkpoint(self, mock_lib, mock_ui, mock_opts, mock_item, tmp_path):
+        """Test that finishing every track removes the journal."""
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        journal_dir = tmp_path / 'fillmissing'
+        assert [name for name in os.listdir(journal_dir) if name.endswith('.checkpoint')] == []
@@ -0,0 +1,182 @@
+"""Tests for filling fields from path rules."""
+
+import os
+from unittest.mock import Mock
+from beetsplug import fillmissing
+from beetsplug.fillmissing import (
+    _SaveContext,
+    _UndoJournal,
+    _apply_path_rules,
+    _compile_path_rule,
+    _match_path_rules,
+    _undo_dir,
+    fill_missing_command,
+    fillmissing_func,
+)
+
+
+def session_opts(*extra, fields='language mood'):
+    opts, _ = fill_missing_command.parser.parse_args(['-f', fields, *extra])
+    return opts
+
+
+def apply_rules(lib, items, patterns, fields=('language', 'mood'), save=None):
+    rules = [_compile_path_rule(pattern) for pattern in patterns]
+    if save is None:
+        save = _SaveContext({'language'}, Mock(), journal=_UndoJournal(_undo_dir()))
+    return _apply_path_rules(lib, [item.id for item in items], rules, list(fields), save)
+
+
+class TestCompilePathRule:
+    """Test turning patterns into regular expressions."""
+
+    def test_template_placeholders(self):
+        """Test that `$field` and `${field}` each match one path component."""
+        rule = _compile_path_rule('/lib/$language/${mood}/')
+
+        match = rule.search('/lib/eng/calm/a/b.mp3')
+
+        assert match.groupdict() == {'language': 'eng', 'mood': 'calm'}
+        assert rule.search('/lib/eng/b.mp3') is None
+
+    def test_template_literal_text(self):
+        """Test that template text outside placeholders is not a regex."""
+        rule = _compile_path_rule('/lib (old)/$language/')
+
+        assert rule.search('/lib (old)/eng/x.mp3').group('language') == 'eng'
+        assert rule.search('/lib old/eng/x.mp3') is None
+
+    def test_repeated_placeholder(self):
+        """Test that a repeated placeholder must match the same text."""
+        rule = _compile_path_rule('/$language/$language/')
+
+        assert rule.search('/eng/eng/x.mp3').group('language') == 'eng'
+        assert rule.search('/eng/fra/x.mp3') is None
+
+    def test_regular_expression(self):
+        """Test that patterns without placeholders are regexes."""
+        rule = _compile_path_rule(r'\[(?P<language>[a-z]{3})\]')
+
+        assert rule.search('/music/Album [hin]/01.mp3').group('language') == 'hin'
+
+    def test_first_rule_wins(self):
+        """Test that earlier rules take precedence per field."""
+        rules = [_compile_path_rule('/a/$mood/'), _compile_path_rule('/$language/$mood/')]
+
+        values = _match_path_rules(rules, '/a/calm/x.mp3', ['language', 'mood'])
+
+        assert values == {'mood': 'calm', 'language': 'a'}
+
+    def test_windows_separators(self, monkeypatch):
+        """Test that templates written with '/' match paths using another separator."""
+        monkeypatch.setattr(os, 'sep', '\\')
+        rules = [_compile_path_rule('/lib/$language/')]
+
+        values = _match_path_rules(rules, 'C:\\lib\\eng\\x.mp3', ['language'])
+
+        assert values == {'language': 'eng'}
+
+
+class TestApplyPathRules:
+    """Test filling the library from path rules."""
+
+    def test_fills_empty_fields(self, real_lib, add_item, mock_ui):
+        """Test that empty fields are filled and set ones are left alone."""
+        empty = add_item('a', path='/lib/eng/calm/a.mp3')
+        set_ = add_item('b', path='/lib/eng/calm/b.mp3', language='fra')
+        other = add_item('c', path='/elsewhere/c.mp3')
+
+        apply_rules(real_lib, [empty, set_, other], ['/lib/$language/$mood/'])
+
+        assert real_lib.get_item(empty.id).language == 'eng'
+        assert real_lib.get_item(empty.id).mood == 'calm'
+        assert real_lib.get_item(set_.id).language == 'fra'
+        assert real_lib.get_item(set_.id).mood == 'calm'
+        assert 'mood' not in real_lib.get_item(other.id)
+        mock_ui.print_.assert_any_call("Filled 3 value(s) on 2 track(s) from path rules.")
+
+    def test_returns_complete_items(self, real_lib, add_item, mock_ui):
+        """Test that only items with every field filled are returned."""
+        both = add_item('a', path='/lib/eng/calm/a.mp3')
+        half = add_item('b', path='/lib/eng/b.mp3')
+
+        complete = apply_rules(real_lib, [both, half], ['/lib/$language/$mood/', '/lib/$language/'])
+
+        assert complete == {both.id}
+
+    def test_chunked_transactions(self, real_lib, add_item, mock_ui, mocker):
+        """Test that paths are matched and stored a chunk at a time."""
+        mocker.patch.object(fillmissing, 'RULE_CHUNK_SIZE', 2)
+        items = [add_item(str(i), path=f'/lib/eng/calm/{i}.mp3') for i in range(5)]
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        apply_rules(real_lib, items, ['/lib/$language/$mood/'])
+
+        # One write transaction per chunk of two paths
+        assert statements.count('BEGIN ') == 3
+
+    def test_saved_through_session(self, real_lib, add_item, mock_ui):
+        """Test that rule edits go to the session's journal and writer."""
+        item = add_item('a', path='/lib/eng/calm/a.mp3')
+        save = _SaveContext({'language'}, Mock(), journal=_UndoJournal(_undo_dir()))
+
+        apply_rules(real_lib, [item], ['/lib/$language/'], save=save)
+
+        assert save.journal.changes == 1
+        assert save.writer.submit.call_args.args[0].id == item.id
+
+
+class TestPathRulesSession:
+    """Test path rules ahead of the prompts."""
+
+    def test_only_missing_skips_filled_tracks(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that tracks completed by rules are not prompted for."""
+        plugin_config['path_rules'].set(['/lib/$language/$mood/', '/lib/$language/'])
+        add_item('a', path='/lib/eng/calm/a.mp3')
+        half = add_item('b', path='/lib/eng/b.mp3')
+        mock_ui.input_.side_effect = ['', 'party']
+
+        fillmissing_func(real_lib, session_opts('--only-missing'), [])
+
+        mock_ui.print_.assert_any_call("1 track(s) left to fill in.")
+        assert mock_ui.input_.call_count == 2
+        assert real_lib.get_item(half.id).language == 'eng'
+        assert real_lib.get_item(half.id).mood == 'party'
+
+    def test_one_session_with_prompts(self, real_lib, add_item, mock_ui, plugin_config, mocker, printed):
+        """Test that rule fills and prompted edits are undone as one session."""
+        mocker.patch('beetsplug.fillmissing.Item.write')
+        plugin_config['path_rules'].set(['/lib/$language/'])
+        item = add_item('a', path='/lib/eng/a.mp3')
+        mock_ui.input_.side_effect = ['', 'calm']
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        lines = printed()
+        hints = [line for line in lines if str(line).startswith('Undo with')]
+        assert len(hints) == 1
+        assert lines.index(hints[0]) > lines.index("Filled 1 value(s) on 1 track(s) from path rules.")
+        assert len(os.listdir(_undo_dir())) == 1
+        stored = real_lib.get_item(item.id)
+        assert (stored.language, stored.mood) == ('eng', 'calm')
+
+    def test_nothing_left(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that the session ends when rules fill everything."""
+        plugin_config['path_rules'].set(['/lib/$language/$mood/'])
+        add_item('a', path='/lib/eng/calm/a.mp3')
+
+        fillmissing_func(real_lib, session_opts('--only-missing'), [])
+
+        mock_ui.print_.assert_any_call("Nothing left to fill in.")
+        mock_ui.input_.assert_not_called()
+
+    def test_invalid_rule(self, real_lib, add_item, mock_ui, plugin_config):
+        """Test that a broken pattern is reported before anything changes."""
+        plugin_config['path_rules'].set(['/lib/(?P<language>'])
+        add_item('a', path='/lib/eng/a.mp3')
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        assert mock_ui.print_.call_args.args[0].startswith("Error: Invalid path rule: /lib/(?P<language>")
+        mock_ui.input_.assert_not_called()
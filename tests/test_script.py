@@ -0,0 +1,133 @@
+"""Tests for headless sessions driven by --script."""
+
+import io
+from unittest.mock import Mock
+from beetsplug.fillmissing import _ScriptInput, fill_missing_command, fillmissing_func
+
+
+def write_script(tmp_path, *lines):
+    path = tmp_path / 'answers.txt'
+    path.write_text(''.join(f'{line}\n' for line in lines), encoding='utf-8')
+    return str(path)
+
+
+class TestScriptInput:
+    """Test reading answers from a script."""
+
+    def test_reads_lines(self, tmp_path):
+        """Test that each call returns the next line without its newline."""
+        script = _ScriptInput(write_script(tmp_path, 'calm', '', 's'))
+
+        assert [script('  mood: '), script(), script()] == ['calm', '', 's']
+        script.close()
+
+    def test_end_of_script_is_eof(self, tmp_path):
+        """Test that running out of lines reads like Ctrl+D."""
+        script = _ScriptInput(write_script(tmp_path, 'calm'))
+        script()
+
+        try:
+            script()
+        except EOFError:
+            pass
+        else:
+            raise AssertionError("expected EOFError")
+        script.close()
+
+    def test_reads_stdin(self, monkeypatch):
+        """Test that '-' reads answers piped to stdin, which stays open."""
+        stdin = io.StringIO('happy\r\n')
+        monkeypatch.setattr('sys.stdin', stdin)
+        script = _ScriptInput('-')
+
+        assert script() == 'happy'
+        script.close()
+        assert not stdin.closed
+
+
+class TestScriptedSession:
+    """Test sessions run from a script."""
+
+    def test_option_default(self):
+        """Test that sessions are interactive by default."""
+        opts, _ = fill_missing_command.parser.parse_args([])
+
+        assert opts.script is None
+
+    def test_answers_from_script(self, mock_lib, mock_ui, mock_opts, mock_items, tmp_path):
+        """Test that values come from the script, not the keyboard."""
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+        mock_opts.fields = 'mood'
+        mock_opts.script = write_script(tmp_path, 'calm', 'dark')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.input_.assert_not_called()
+        items[0].__setitem__.assert_called_once_with('mood', 'calm')
+        items[1].__setitem__.assert_called_once_with('mood', 'dark')
+        mock_ui.print_.assert_any_call("Done!")
+
+    def test_commands_in_script(self, mock_lib, mock_ui, mock_opts, mock_items, mock_subprocess, tmp_path):
+        """Test that skip and back work, and play is ignored."""
+        subprocess_mock, _ = mock_subprocess
+        items = mock_items(2)
+        mock_lib.items.return_value = items
+        mock_opts.fields = 'mood context'
+        mock_opts.script = write_script(tmp_path, 's', 'p', 'wrong', 'b', 'calm', 'home')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        items[0].store.assert_not_called()
+        assert items[1].__setitem__.call_args_list[-2:] == [
+            (('mood', 'calm'),), (('context', 'home'),),
+        ]
+        items[1].store.assert_called_once()
+        subprocess_mock.Popen.assert_not_called()
+
+    def test_per_track_output_silenced(self, mock_lib, mock_ui, mock_opts, mock_item, tmp_path, printed):
+        """Test that headers and prompts are not rendered."""
+        mock_lib.items.return_value = [mock_item]
+        mock_opts.script = write_script(tmp_path, 'calm', '', '')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        lines = printed()
+        assert lines[0] == "Found 1 track(s) matching query."
+        assert lines[1].startswith("Undo with: ")
+        assert lines[2:] == ["Done!"]
+
+    def test_end_of_script_saves_progress(self, mock_lib, mock_ui, mock_opts, mock_items, tmp_path, printed):
+        """Test that a short script stores what it answered and stops."""
+        items = mock_items(2)
+        items[0].get = Mock(return_value='')
+        mock_lib.items.return_value = items
+        mock_opts.fields = 'mood context'
+        mock_opts.script = write_script(tmp_path, 'calm')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        items[0].__setitem__.assert_called_once_with('mood', 'calm')
+        items[0].store.assert_called_once()
+        assert "End of script." in printed()
+        assert "Done!" not in printed()
+
+    def test_missing_script(self, mock_lib, mock_ui, mock_opts, mock_item, tmp_path, printed):
+        """Test that an unreadable script stops before any prompt."""
+        mock_lib.items.return_value = [mock_item]
+        mock_opts.script = str(tmp_path / 'missing.txt')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert printed()[-1].startswith("Error: Cannot read script:")
+        mock_item.store.assert_not_called()
+
+    def test_no_suggestions_loaded(self, mock_lib, mock_ui, mock_opts, mock_item, tmp_path):
+        """Test that scripted runs skip the value statistics scan."""
+        from beetsplug import fillmissing
+        mock_lib.items.return_value = [mock_item]
+        mock_opts.script = write_script(tmp_path, '', '', '')
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        fillmissing._load_value_indexes.assert_not_called()
@@ -0,0 +1,290 @@
+"""Tests for value suggestions and completion."""
+
+import random
+from unittest.mock import Mock
+from beetsplug import fillmissing
+from beetsplug.fillmissing import (
+    COMPLETION_LIMIT,
+    ValueIndex,
+    _Completer,
+    _SaveContext,
+    _build_value_indexes,
+    _flush_edits,
+    _load_value_indexes,
+    _save_value_indexes,
+    fillmissing_func,
+)
+
+
+class TestValueIndex:
+    """Test the sorted-array prefix index."""
+
+    def test_top_values_by_frequency(self):
+        """Test that the most used values come first."""
+        index = ValueIndex({'chill': 3, 'happy': 10, 'sad': 1})
+
+        assert index.top(2) == ['happy', 'chill']
+
+    def test_prefix_completion(self):
+        """Test that only values with the prefix are offered, ranked."""
+        index = ValueIndex({'chill': 3, 'cheerful': 7, 'happy': 10})
+
+        assert index.complete('ch') == ['cheerful', 'chill']
+        assert index.complete('chi') == ['chill']
+        assert index.complete('x') == []
+
+    def test_prefix_is_case_insensitive(self):
+        """Test that the case of the typed prefix does not matter."""
+        index = ValueIndex({'English': 2, 'eng': 5})
+
+        assert index.complete('EN') == ['eng', 'English']
+
+    def test_add_new_and_existing_values(self):
+        """Test that entered values join the index and bump counts."""
+        index = ValueIndex({'calm': 1})
+        index.add('dark')
+        index.add('calm')
+        index.add('calm')
+
+        assert index.counts == {'calm': 3, 'dark': 1}
+        assert index.complete('d') == ['dark']
+
+    def test_large_index_prefix_slice(self):
+        """Test lookups in an index with many distinct values."""
+        index = ValueIndex({f'v{i:06d}': i for i in range(100000)})
+
+        assert index.complete('v00001', limit=3) == ['v000019', 'v000018', 'v000017']
+
+    def test_top_kept_current(self):
+        """Test that the cached top values follow every count change."""
+        rng = random.Random(7)
+        index = ValueIndex({f'v{i}': rng.randint(1, 5) for i in range(50)})
+        index.top(5)
+
+        for _ in range(500):
+            index.add(f'v{rng.randrange(60)}', rng.choice([-2, -1, 1, 1, 3]))
+            assert index.top(5) == ValueIndex(index.counts).top(5)
+
+    def test_top_served_from_cache(self, mocker):
+        """Test that repeated prompts do not rank every value again."""
+        index = ValueIndex({f'v{i}': i for i in range(1000)})
+        index.top(5)
+        nlargest = mocker.spy(fillmissing.heapq, 'nlargest')
+
+        index.add('new', 5000)
+
+        assert index.top(5) == ['new', 'v999', 'v998', 'v997', 'v996']
+        nlargest.assert_not_called()
+
+
+class TestBuildValueIndexes:
+    """Test gathering value statistics from the database."""
+
+    def test_flexible_and_fixed_fields(self, real_lib, add_item):
+        """Test that both kinds of fields are counted in one pass."""
+        add_item(mood='calm', language='eng')
+        add_item(mood='calm', language='fra')
+        add_item(mood='dark', language='eng')
+        add_item(title='no values')
+
+        indexes = _build_value_indexes(real_lib, ['mood', 'language'])
+
+        assert indexes['mood'].counts == {'calm': 2, 'dark': 1}
+        assert indexes['language'].counts == {'eng': 2, 'fra': 1}
+
+    def test_empty_values_ignored(self, real_lib, add_item):
+        """Test that blank and default values are not suggested."""
+        add_item(mood='', year=0)
+        add_item(mood='calm', year=1999)
+
+        indexes = _build_value_indexes(real_lib, ['mood', 'year'])
+
+        assert indexes['mood'].counts == {'calm': 1}
+        assert indexes['year'].counts == {'1999': 1}
+
+    def test_field_without_values(self, real_lib):
+        """Test that every requested field gets an index."""
+        assert len(_build_value_indexes(real_lib, ['context'])['context']) == 0
+
+
+class TestCompleter:
+    """Test readline completion."""
+
+    def test_completes_from_index(self):
+        """Test that successive states walk the ranked matches."""
+        completer = _Completer()
+        completer.index = ValueIndex({'chill': 3, 'cheerful': 7})
+
+        assert completer._complete('ch', 0) == 'cheerful'
+        assert completer._complete('ch', 1) == 'chill'
+        assert completer._complete('ch', 2) is None
+
+    def test_matches_limited(self):
+        """Test that a short prefix offers only the most frequent values."""
+        completer = _Completer()
+        completer.index = ValueIndex({f'v{i}': i for i in range(COMPLETION_LIMIT * 2)})
+
+        assert completer._complete('', 0) == f'v{COMPLETION_LIMIT * 2 - 1}'
+        assert len(completer._matches) == COMPLETION_LIMIT
+
+    def test_no_index(self):
+        """Test that fields without an index complete nothing."""
+        completer = _Completer()
+
+        assert completer._complete('ch', 0) is None
+
+
+class TestSuggestionsInSession:
+    """Test suggestions shown while prompting."""
+
+    def test_top_values_shown(self, mock_lib, mock_ui, mock_opts, mock_item, mocker):
+        """Test that the common values are printed before the prompt."""
+        mocker.patch(
+            'beetsplug.fillmissing._load_value_indexes',
+            return_value={'mood': ValueIndex({'chill': 2, 'happy': 5})},
+        )
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("    ↳ happy | chill")
+
+    def test_suggestion_count_configurable(self, mock_lib, mock_ui, mock_opts, mock_item, mocker, plugin_config):
+        """Test that the number of suggestions comes from the config."""
+        plugin_config['suggestions'].set(1)
+        mocker.patch(
+            'beetsplug.fillmissing._load_value_indexes',
+            return_value={'mood': ValueIndex({'chill': 2, 'happy': 5})},
+        )
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("    ↳ happy")
+
+    def test_suggestions_disabled(self, mock_lib, mock_ui, mock_opts, mock_item, plugin_config):
+        """Test that a count of 0 skips building the index."""
+        plugin_config['suggestions'].set(0)
+        mock_item.get = Mock(return_value='')
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        fillmissing._load_value_indexes.assert_not_called()
+
+    def test_entered_values_become_suggestions(self, mock_lib, mock_ui, mock_opts, mock_items, mocker):
+        """Test that a value typed on one track is suggested on the next."""
+        index = ValueIndex()
+        mocker.patch(
+            'beetsplug.fillmissing._load_value_indexes',
+            return_value={'mood': index},
+        )
+        mock_lib.items.return_value = mock_items(2)
+        mock_ui.input_.side_effect = ['dreamy', '', '', '', '', '']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_ui.print_.assert_any_call("    ↳ dreamy")
+
+
+class TestValueCache:
+    """Test the on-disk cache of value statistics."""
+
+    def test_warm_start_skips_aggregate_query(self, real_lib, add_item, mocker):
+        """Test that an unchanged library is served from the cache."""
+        add_item(mood='calm')
+        _save_value_indexes(real_lib, _load_value_indexes(real_lib, ['mood']))
+        build = mocker.spy(fillmissing, '_build_value_indexes')
+
+        indexes = _load_value_indexes(real_lib, ['mood'])
+
+        build.assert_not_called()
+        assert indexes['mood'].counts == {'calm': 1}
+
+    def test_library_change_invalidates_cache(self, real_lib, add_item):
+        """Test that edits made outside the session trigger a rebuild."""
+        item = add_item(mood='calm')
+        _save_value_indexes(real_lib, _load_value_indexes(real_lib, ['mood']))
+        item.mood = 'dark'
+        item.store()
+
+        indexes = _load_value_indexes(real_lib, ['mood'])
+
+        assert indexes['mood'].counts == {'dark': 1}
+
+    def test_only_uncached_fields_counted(self, real_lib, add_item, mocker):
+        """Test that new fields are added to a current cache."""
+        add_item(mood='calm', context='party')
+        _save_value_indexes(real_lib, _load_value_indexes(real_lib, ['mood']))
+        build = mocker.spy(fillmissing, '_build_value_indexes')
+
+        indexes = _load_value_indexes(real_lib, ['mood', 'context'])
+
+        build.assert_called_once_with(real_lib, ['context'])
+        assert indexes['context'].counts == {'party': 1}
+
+    def test_session_edits_keep_cache_current(self, real_lib, add_item, mocker):
+        """Test that values stored in a session are counted in place."""
+        item = add_item(mood='calm')
+        indexes = _load_value_indexes(real_lib, ['mood'])
+        _flush_edits(item, {'mood': 'dark'}, _SaveContext(set(), Mock(), indexes))
+        _save_value_indexes(real_lib, indexes)
+        build = mocker.spy(fillmissing, '_build_value_indexes')
+
+        cached = _load_value_indexes(real_lib, ['mood'])
+
+        build.assert_not_called()
+        assert cached['mood'].counts == {'dark': 1}
+
+    def test_other_fields_survive_session(self, real_lib, add_item, mocker):
+        """Test that a session's writes keep the cached stats of other fields."""
+        item = add_item(mood='calm', language='eng')
+        _save_value_indexes(real_lib, _load_value_indexes(real_lib, ['language']))
+        indexes = _load_value_indexes(real_lib, ['mood'])
+        _flush_edits(item, {'mood': 'dark'}, _SaveContext(set(), Mock(), indexes))
+        _save_value_indexes(real_lib, indexes)
+        build = mocker.spy(fillmissing, '_build_value_indexes')
+
+        cached = _load_value_indexes(real_lib, ['language', 'mood'])
+
+        build.assert_not_called()
+        assert cached['language'].counts == {'eng': 1}
+        assert cached['mood'].counts == {'dark': 1}
+
+    def test_write_by_other_process_invalidates(self, real_lib, add_item, tmp_path):
+        """Test that a write from another connection is not stamped as current."""
+        from beets.library import Library
+        item = add_item(mood='calm')
+        indexes = _load_value_indexes(real_lib, ['mood'])
+        other = Library(str(tmp_path / 'library.db'), str(tmp_path / 'music'))
+        other_item = other.get_item(item.id)
+        other_item.mood = 'dark'
+        other_item.store()
+        other._close()
+
+        _save_value_indexes(real_lib, indexes)
+
+        assert _load_value_indexes(real_lib, ['mood'])['mood'].counts == {'dark': 1}
+
+    def test_in_memory_library_not_cached(self, tmp_path, monkeypatch):
+        """Test that libraries without a database file are never cached."""
+        from beets.library import Library
+        monkeypatch.chdir(tmp_path)  # beets drops migration backups here
+        lib = Library(':memory:', str(tmp_path))
+
+        _save_value_indexes(lib, {'mood': ValueIndex({'calm': 1})})
+
+        assert not (tmp_path / 'fillmissing').exists()
+
+    def test_removing_last_use_drops_value(self):
+        """Test that a count reaching zero removes the value."""
+        index = ValueIndex({'calm': 1, 'cool': 2})
+        index.add('calm', -1)
+
+        assert index.counts == {'cool': 2}
+        assert index.complete('c') == ['cool']
@@ -0,0 +1,164 @@
+"""Tests for the undo journal and --rollback."""
+
+import json
+import os
+from beetsplug.fillmissing import (
+    DIRTY_FIELD,
+    _UndoJournal,
+    _undo_dir,
+    fill_missing_command,
+    fillmissing_func,
+)
+
+
+def session_opts(fields='mood'):
+    opts, _ = fill_missing_command.parser.parse_args(['-f', fields])
+    return opts
+
+
+def rollback_opts(session):
+    opts, _ = fill_missing_command.parser.parse_args(['--rollback', session])
+    return opts
+
+
+class TestUndoJournal:
+    """Test recording changes."""
+
+    def test_records_changes(self, tmp_path):
+        """Test that each change is a JSON line with old and new value."""
+        journal = _UndoJournal(str(tmp_path))
+        journal.record(1, 'mood', None, 'calm')
+        journal.record(1, 'year', 1999, '2001')
+        journal.close()
+
+        lines = [json.loads(line) for line in open(journal.path)]
+        assert [(c['id'], c['field'], c['old'], c['new']) for c in lines] == [
+            (1, 'mood', None, 'calm'), (1, 'year', 1999, '2001'),
+        ]
+        assert all(isinstance(c['time'], float) for c in lines)
+
+    def test_empty_journal_removed(self, tmp_path):
+        """Test that sessions without changes leave nothing behind."""
+        journal = _UndoJournal(str(tmp_path))
+        journal.close()
+
+        assert os.listdir(tmp_path) == []
+
+    def test_sessions_get_unique_names(self, tmp_path):
+        """Test that two sessions in the same second do not collide."""
+        first = _UndoJournal(str(tmp_path))
+        second = _UndoJournal(str(tmp_path))
+
+        assert first.session != second.session
+        first.close()
+        second.close()
+
+    def test_read_keeps_first_old_value(self, tmp_path):
+        """Test that a field edited twice reverts to its value before both."""
+        journal = _UndoJournal(str(tmp_path))
+        journal.record(1, 'mood', 'sad', 'calm')
+        journal.record(1, 'mood', 'calm', 'dark')
+        journal.close()
+
+        assert _UndoJournal.read(journal.path) == {(1, 'mood'): 'sad'}
+
+    def test_session_journals_stored_edits(self, real_lib, add_item, mock_ui, last_session):
+        """Test that an interactive session writes its changes to the journal."""
+        item = add_item('a', mood='sad')
+        mock_ui.input_.side_effect = ['calm']
+
+        fillmissing_func(real_lib, session_opts(), [])
+
+        path = os.path.join(_undo_dir(), f'{last_session()}.jsonl')
+        assert _UndoJournal.read(path) == {(item.id, 'mood'): 'sad'}
+
+
+class TestRollback:
+    """Test reverting a session."""
+
+    def test_restores_previous_values(self, real_lib, add_item, mock_ui, last_session):
+        """Test that changed fields get their old values back."""
+        item = add_item('a', mood='sad', year=1999)
+        fresh = add_item('b')
+        mock_ui.input_.side_effect = ['calm', '2001', 'new', '']
+        fillmissing_func(real_lib, session_opts('mood year'), [])
+
+        fillmissing_func(real_lib, rollback_opts(last_session()), [])
+
+        restored = real_lib.get_item(item.id)
+        assert restored.mood == 'sad'
+        assert restored.year == 1999
+        assert 'mood' not in real_lib.get_item(fresh.id)
+        mock_ui.print_.assert_any_call("Rolled back 3 change(s) on 2 track(s).")
+
+    def test_single_transaction(self, real_lib, add_item, mock_ui, last_session):
+        """Test that the whole session is reverted in one commit."""
+        for name in 'abc':
+            add_item(name)
+        mock_ui.input_.side_effect = ['calm'] * 3
+        fillmissing_func(real_lib, session_opts(), [])
+        statements = []
+        real_lib._connection().set_trace_callback(statements.append)
+
+        fillmissing_func(real_lib, rollback_opts(last_session()), [])
+
+        assert statements.count('BEGIN ') == 1
+
+    def test_only_tag_backed_changes_rewritten(self, real_lib, add_item, mock_ui, mocker, last_session):
+        """Test that files are only retagged where a tag-backed field changed."""
+        tagged = add_item('a')
+        add_item('b')
+        writer = mocker.patch('beetsplug.fillmissing._TagWriter').return_value
+        writer.drain.return_value = []
+        mock_ui.input_.side_effect = ['eng', 'calm', '', 'calm']
+        fillmissing_func(real_lib, session_opts('language mood'), [])
+        writer.submit.reset_mock()
+
+        fillmissing_func(real_lib, rollback_opts(last_session()), [])
+
+        assert [call.args[0].id for call in writer.submit.call_args_list] == [tagged.id]
+        assert real_lib.get_item(tagged.id).language == ''
+
+    def test_db_only_session_rolled_back(self, real_lib, add_item, mock_ui, mocker, last_session):
+        """Test that deferred writes are dropped rather than replayed on rollback."""
+        item = add_item('a')
+        writer = mocker.patch('beetsplug.fillmissing._TagWriter').return_value
+        writer.drain.return_value = []
+        mock_ui.input_.side_effect = ['eng']
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'language', '--db-only'])
+        fillmissing_func(real_lib, opts, [])
+        assert DIRTY_FIELD in real_lib.get_item(item.id)
+
+        fillmissing_func(real_lib, rollback_opts(last_session()), [])
+
+        writer.submit.assert_not_called()
+        restored = real_lib.get_item(item.id)
+        assert restored.language == ''
+        assert DIRTY_FIELD not in restored
+
+    def test_rolled_back_once(self, real_lib, add_item, mock_ui, last_session):
+        """Test that the journal is retired after a rollback."""
+        add_item('a')
+        mock_ui.input_.side_effect = ['calm']
+        fillmissing_func(real_lib, session_opts(), [])
+        session = last_session()
+        fillmissing_func(real_lib, rollback_opts(session), [])
+
+        fillmissing_func(real_lib, rollback_opts(session), [])
+
+        assert mock_ui.print_.call_args.args[0].startswith(
+            f"Error: No undo journal for session '{session}'"
+        )
+        assert os.path.exists(os.path.join(_undo_dir(), f'{session}.jsonl.rolledback'))
+
+    def test_import_can_be_rolled_back(self, real_lib, add_item, mock_ui, tmp_path, last_session):
+        """Test that bulk imports are journaled too."""
+        item = add_item('a', mood='sad')
+        csv_file = tmp_path / 'values.csv'
+        csv_file.write_text(f"id,mood\n{item.id},calm\n")
+        opts, _ = fill_missing_command.parser.parse_args(['-f', 'mood', '--import', str(csv_file)])
+        fillmissing_func(real_lib, opts, [])
+
+        fillmissing_func(real_lib, rollback_opts(last_session()), [])
+
+        assert real_lib.get_item(item.id).mood == 'sad'
@@ -0,0 +1,129 @@
+"""Tests for the background tag writer."""
+
+import threading
+import time
+from unittest.mock import Mock
+from beetsplug.fillmissing import fillmissing_func, _TagWriter
+
+
+def make_item(path, write=None):
+    item = Mock()
+    item.path = path
+    item.write = Mock(side_effect=write)
+    return item
+
+
+class TestTagWriter:
+    """Test the bounded write pool."""
+
+    def test_writes_all_items(self):
+        """Test that every submitted item is written after draining."""
+        writer = _TagWriter(2)
+        items = [make_item(f'/music/{i}.flac'.encode()) for i in range(10)]
+
+        for item in items:
+            writer.submit(item)
+
+        assert writer.drain() == []
+        for item in items:
+            item.write.assert_called_once()
+
+    def test_same_path_written_in_order(self):
+        """Test that writes to one path never overtake each other."""
+        order = []
+
+        def slow_write():
+            time.sleep(0.05)
+            order.append('first')
+
+        writer = _TagWriter(4)
+        writer.submit(make_item(b'/music/a.flac', slow_write))
+        writer.submit(make_item(b'/music/a.flac', lambda: order.append('second')))
+        writer.drain()
+
+        assert order == ['first', 'second']
+
+    def test_different_paths_run_concurrently(self):
+        """Test that writes to different files overlap."""
+        barrier = threading.Barrier(2, timeout=2)
+        writer = _TagWriter(2)
+        writer.submit(make_item(b'/music/a.flac', barrier.wait))
+        writer.submit(make_item(b'/music/b.flac', barrier.wait))
+
+        # Both writes must be in flight at once to pass the barrier
+        assert writer.drain() == []
+
+    def test_failures_collected(self):
+        """Test that write errors are collected instead of raised."""
+        writer = _TagWriter(2)
+        bad = make_item(b'/music/bad.flac', OSError('read-only'))
+        good = make_item(b'/music/good.flac')
+
+        writer.submit(bad)
+        writer.submit(good)
+        failures = writer.drain()
+
+        assert len(failures) == 1
+        assert failures[0][0] is bad
+        assert isinstance(failures[0][1], OSError)
+        good.write.assert_called_once()
+
+
+class TestBackgroundWrites:
+    """Test how the session uses the writer."""
+
+    def test_writes_finish_before_done(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that pending writes are drained before 'Done!'."""
+        events = []
+        mock_item.get = Mock(return_value='')
+        mock_item.write.side_effect = lambda: (time.sleep(0.05), events.append('write'))
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.print_.side_effect = lambda msg='': events.append(msg)
+
+        mock_ui.input_.side_effect = ['', '', 'eng']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        assert events.index('write') < events.index("Done!")
+
+    def test_write_failure_reported_at_end(self, mock_lib, mock_ui, mock_opts, mock_item):
+        """Test that failed writes are summarized instead of crashing."""
+        mock_item.get = Mock(return_value='')
+        mock_item.path = b'/music/broken.flac'
+        mock_item.write.side_effect = OSError('disk full')
+        mock_lib.items.return_value = [mock_item]
+
+        mock_ui.input_.side_effect = ['', '', 'eng']
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        mock_item.store.assert_called_once()
+        mock_ui.print_.assert_any_call("✗ 1 tag write(s) failed:")
+        mock_ui.print_.assert_any_call("    /music/broken.flac: disk full")
+
+    def test_writes_drained_on_interrupt(self, mock_lib, mock_ui, mock_opts, mock_items):
+        """Test that Ctrl+C still waits for queued writes."""
+        items = mock_items(2)
+        items[0].write.side_effect = lambda: time.sleep(0.05)
+        mock_lib.items.return_value = items
+
+        # Fill the first track, then interrupt on the second
+        mock_ui.input_.side_effect = ['', '', 'eng', KeyboardInterrupt()]
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        items[0].write.assert_called_once()
+        items[1].write.assert_not_called()
+
+    def test_write_threads_configurable(self, mock_lib, mock_ui, mock_opts, mock_item, plugin_config, mocker):
+        """Test that the pool size comes from the plugin configuration."""
+        plugin_config['write_threads'].set(7)
+        writer_cls = mocker.patch('beetsplug.fillmissing._TagWriter')
+        writer_cls.return_value.drain.return_value = []
+        mock_lib.items.return_value = [mock_item]
+        mock_ui.input_.return_value = ''
+
+        fillmissing_func(mock_lib, mock_opts, [])
+
+        writer_cls.assert_called_once()
+        assert writer_cls.call_args.args == (7,)